@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Optional
 
 class Settings(BaseSettings):
     APP_NAME: str = "Expense Tracker"
@@ -7,10 +8,30 @@ class Settings(BaseSettings):
     UPLOAD_DIR: Path = Path("uploads")
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: set = {"jpg", "jpeg", "png", "pdf"}
+    BANK_STATEMENT_EXTENSIONS: set = {"csv", "ofx", "qfx"}
     TESSERACT_LANG: str = "fra+eng"
+    OCR_TIERED: bool = True  # Passe rapide d'abord, passe complète si nécessaire
+    OCR_FAST_MAX_SIDE: int = 1600  # Plus grand côté de l'image en passe rapide
+    OCR_MIN_CONFIDENCE: float = 70.0  # Confiance moyenne minimale (0-100) de la passe rapide
+    TENANT_SHARDING: bool = False  # Une base SQLite / un schéma PostgreSQL par tenant
+    TENANT_DIR: Path = Path("tenants")  # Fichiers SQLite des tenants
+    TENANT_MAX_ENGINES: int = 64  # Taille du cache LRU des moteurs
+    TENANT_TOKEN_SECRET: Optional[str] = None  # Clé HMAC des jetons d'URL (aléatoire par processus si vide)
+    TENANT_TOKEN_TTL: int = 3600  # Durée de validité des jetons d'URL (secondes)
+    ADMIN_TOKEN: Optional[str] = None  # En-tête X-Admin-Token (routes /admin désactivées si vide)
+    STORAGE_DRIVER: str = "local"  # "local" ou "s3"
+    STORAGE_RECOMPRESS: str = "none"  # "none", "lossless" ou "visual"
+    STORAGE_RECOMPRESS_QUALITY: int = 90  # Qualité WebP en mode "visual"
+    S3_BUCKET: str = "receipts"
+    S3_ENDPOINT_URL: Optional[str] = None  # Ex: http://minio:9000
+    THUMBNAIL_DIR: Path = Path("uploads/thumbnails")
+    THUMBNAIL_SIZE: int = 320  # Côté max en pixels
+    THUMBNAIL_QUALITY: int = 75  # Qualité WebP
+    ANALYTICS_CACHE_SIZE: int = 32  # Nombre de tenants gardés en cache
+    ANALYTICS_CACHE_TTL: int = 300  # Secondes (borne la péremption entre workers)
+    PRELOAD_SERVICES: str = ""  # Ex: "ocr,thumbnail" pour un worker dédié à l'OCR
     
     class Config:
         env_file = ".env"
 
 settings = Settings()
-settings.UPLOAD_DIR.mkdir(exist_ok=True)
@@ -3,13 +3,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.models import init_db
-from app.routers import expenses
+from app.routers import expenses, admin, bank
+from app.services import preload
 from app.config import settings
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await init_db()
+    if settings.PRELOAD_SERVICES:
+        preload(*[name.strip() for name in settings.PRELOAD_SERVICES.split(",") if name.strip()])
     yield
     # Shutdown
     pass
@@ -32,6 +35,8 @@ app.add_middleware(
 
 # Routers
 app.include_router(expenses.router, prefix="/api")
+app.include_router(bank.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
 
 @app.get("/")
 async def root():
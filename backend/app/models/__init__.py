@@ -1,2 +1,5 @@
-from app.models.database import Base, get_db, init_db
+from app.models.database import (
+    Base, get_db, get_tenant_id, init_db, tenant_router, TenantRouter, make_tenant_token
+)
 from app.models.expense import Expense, ExpenseCategory
+from app.models.bank_transaction import BankTransaction
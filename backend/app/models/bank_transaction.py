@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.models.database import Base
+
+class BankTransaction(Base):
+    __tablename__ = "bank_transactions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    import_id = Column(String(36), nullable=False, index=True)  # Lot d'import du relevé
+    date = Column(Date, nullable=False, index=True)
+    amount = Column(Float, nullable=False)  # Négatif = débit
+    label = Column(String(500), nullable=True)  # Libellé bancaire
+    reference = Column(String(255), nullable=True)  # FITID (OFX)
+    expense_id = Column(Integer, ForeignKey("expenses.id", ondelete="SET NULL"), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Pour le multi-tenant futur
+    user_id = Column(Integer, nullable=True, index=True)
@@ -1,15 +1,225 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from fastapi import Depends, Header, HTTPException, Query
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+import asyncio
+import hashlib
+import hmac
+import secrets
+import time
 from app.config import settings
 
 engine = create_async_engine(settings.DATABASE_URL, echo=True)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
-async def get_db():
-    async with AsyncSessionLocal() as session:
-        yield session
+T = TypeVar("T")
+
+
+class TenantRouter:
+    """
+    Route chaque tenant (user_id) vers sa propre base.
+
+    - SQLite: un fichier par tenant ({TENANT_DIR}/tenant_{id}.db), donc un verrou
+      d'écriture par tenant au lieu d'un verrou global.
+    - PostgreSQL: un schéma par tenant (tenant_{id}) via schema_translate_map,
+      sur le pool de connexions partagé.
+
+    Les moteurs sont gardés dans un cache LRU borné et chaque shard est migré
+    (create_all) au plus une fois par processus, au premier accès.
+    """
+
+    def __init__(self, base_engine: AsyncEngine, tenant_dir: Path, max_engines: int = 64):
+        self.base_engine = base_engine
+        self.tenant_dir = tenant_dir
+        self.max_engines = max_engines
+        self.is_sqlite = base_engine.dialect.name == "sqlite"
+        self._sessions: "OrderedDict[int, Tuple[AsyncEngine, sessionmaker]]" = OrderedDict()
+        self._migrated: set = set()
+        self._lock = asyncio.Lock()
+        self._migration_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def schema_name(tenant_id: int) -> str:
+        return f"tenant_{tenant_id}"
+
+    def _create_engine(self, tenant_id: int) -> AsyncEngine:
+        if self.is_sqlite:
+            self.tenant_dir.mkdir(parents=True, exist_ok=True)
+            url = self.base_engine.url.set(database=str(self.tenant_dir / f"tenant_{tenant_id}.db"))
+            return create_async_engine(url, echo=self.base_engine.echo)
+        # Même pool que la base principale, seules les tables sont redirigées
+        return self.base_engine.execution_options(
+            schema_translate_map={None: self.schema_name(tenant_id)}
+        )
+
+    async def _ensure_migrated(self, tenant_id: int, tenant_engine: AsyncEngine) -> None:
+        if tenant_id in self._migrated:
+            return
+        async with tenant_engine.begin() as conn:
+            if not self.is_sqlite:
+                await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{self.schema_name(tenant_id)}"'))
+            await conn.run_sync(Base.metadata.create_all)
+        self._migrated.add(tenant_id)
+
+    async def session_factory(self, tenant_id: int) -> sessionmaker:
+        """Fabrique de sessions du tenant (moteur créé et migré si nécessaire)."""
+        cached = self._sessions.get(tenant_id)
+        if cached is not None:
+            self._sessions.move_to_end(tenant_id)
+            return cached[1]
+
+        async with self._lock:
+            cached = self._sessions.get(tenant_id)
+            if cached is not None:
+                return cached[1]
+            tenant_engine = self._create_engine(tenant_id)
+            await self._ensure_migrated(tenant_id, tenant_engine)
+            factory = sessionmaker(tenant_engine, class_=AsyncSession, expire_on_commit=False)
+            self._sessions[tenant_id] = (tenant_engine, factory)
+
+            # Éviction LRU: les connexions en cours restent valides jusqu'à leur libération
+            while len(self._sessions) > self.max_engines:
+                _, (evicted, _) = self._sessions.popitem(last=False)
+                if self.is_sqlite:
+                    await evicted.dispose()
+            return factory
+
+    async def known_tenants(self) -> List[int]:
+        """Liste les tenants ayant déjà un shard."""
+        if self.is_sqlite:
+            ids = (path.stem.removeprefix("tenant_") for path in self.tenant_dir.glob("tenant_*.db"))
+            return sorted(int(tenant_id) for tenant_id in ids if tenant_id.isdigit())
+        async with self.base_engine.connect() as conn:
+            result = await conn.execute(text(
+                "SELECT schema_name FROM information_schema.schemata WHERE schema_name LIKE 'tenant\\_%'"
+            ))
+            ids = (name.removeprefix("tenant_") for (name,) in result)
+            return sorted(int(tenant_id) for tenant_id in ids if tenant_id.isdigit())
+
+    async def migrate_all(self) -> None:
+        """Migre tous les shards existants sans remplir le cache LRU."""
+        for tenant_id in await self.known_tenants():
+            async with self._lock:
+                if tenant_id in self._migrated:
+                    continue
+                tenant_engine = self._create_engine(tenant_id)
+                try:
+                    await self._ensure_migrated(tenant_id, tenant_engine)
+                finally:
+                    if self.is_sqlite:
+                        await tenant_engine.dispose()
+
+    def start_background_migration(self) -> None:
+        """Lance migrate_all() en tâche de fond (le démarrage n'attend pas)."""
+        if self._migration_task is None:
+            self._migration_task = asyncio.create_task(self.migrate_all())
+
+    async def fan_out(self, query: Callable[[AsyncSession], Awaitable[T]],
+                      concurrency: int = 8) -> Dict[int, T]:
+        """
+        Exécute `query` sur chaque tenant, avec une concurrence bornée.
+
+        Comme migrate_all(), chaque shard est ouvert sur un moteur temporaire, hors
+        du cache LRU et du verrou: un parcours complet n'évince pas les moteurs des
+        tenants actifs et ne bloque pas les requêtes.
+
+        Returns:
+            Résultat de `query` par tenant_id.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(tenant_id: int) -> Tuple[int, T]:
+            async with semaphore:
+                tenant_engine = self._create_engine(tenant_id)
+                try:
+                    if tenant_id not in self._migrated:
+                        async with self._lock:
+                            await self._ensure_migrated(tenant_id, tenant_engine)
+                    async with AsyncSession(tenant_engine, expire_on_commit=False) as session:
+                        session.info["tenant_id"] = tenant_id
+                        return tenant_id, await query(session)
+                finally:
+                    if self.is_sqlite:
+                        await tenant_engine.dispose()
+
+        return dict(await asyncio.gather(*(run(tenant_id) for tenant_id in await self.known_tenants())))
+
+
+tenant_router = (
+    TenantRouter(engine, settings.TENANT_DIR, settings.TENANT_MAX_ENGINES)
+    if settings.TENANT_SHARDING else None
+)
+
+# Sans secret configuré, les jetons ne sont valables que dans le processus qui les a émis
+_TOKEN_KEY = (settings.TENANT_TOKEN_SECRET or secrets.token_hex(32)).encode()
+
+
+def make_tenant_token(tenant_id: int, ttl: int = settings.TENANT_TOKEN_TTL) -> str:
+    """Jeton signé "{tenant_id}.{expiration}.{hmac}" à passer en paramètre d'URL."""
+    payload = f"{tenant_id}.{int(time.time()) + ttl}"
+    signature = hmac.new(_TOKEN_KEY, payload.encode(), hashlib.sha256).hexdigest()
+    return f"{payload}.{signature}"
+
+
+def read_tenant_token(token: str) -> Optional[int]:
+    """tenant_id d'un jeton valide et non expiré, sinon None."""
+    try:
+        tenant_id, expires, signature = token.split(".")
+        expected = hmac.new(_TOKEN_KEY, f"{tenant_id}.{expires}".encode(), hashlib.sha256).hexdigest()
+        # Comparaison en octets: compare_digest refuse les str non ASCII (TypeError)
+        if not hmac.compare_digest(signature.encode(), expected.encode()) or int(expires) < time.time():
+            return None
+        return int(tenant_id)
+    except ValueError:
+        return None
+
+
+async def get_tenant_id(
+    x_tenant_id: Optional[int] = Header(None, ge=1),
+    tenant_token: Optional[str] = Query(None),
+) -> Optional[int]:
+    """
+    Tenant de la requête si le sharding est actif (None sinon).
+
+    - En-tête X-Tenant-ID pour les appels API;
+    - paramètre `tenant_token` (cf. make_tenant_token) pour les URL chargées sans
+      en-têtes (<img src>, téléchargements d'exports).
+
+    Sans l'un ou l'autre, la requête est rejetée au lieu de retomber sur la base
+    principale.
+    """
+    if tenant_router is None:
+        return None
+    if x_tenant_id is not None:
+        return x_tenant_id
+    if tenant_token is not None:
+        tenant_id = read_tenant_token(tenant_token)
+        if tenant_id is None:
+            raise HTTPException(403, "Jeton de tenant invalide ou expiré")
+        return tenant_id
+    raise HTTPException(400, "Tenant requis (en-tête X-Tenant-ID ou paramètre tenant_token)")
+
+
+async def get_db(tenant_id: Optional[int] = Depends(get_tenant_id)):
+    """
+    Session de la base du tenant si le sharding est actif, sinon de la base principale.
+    """
+    if tenant_id is not None:
+        factory = await tenant_router.session_factory(tenant_id)
+        async with factory() as session:
+            session.info["tenant_id"] = tenant_id
+            yield session
+    else:
+        async with AsyncSessionLocal() as session:
+            yield session
 
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    if tenant_router is not None:
+        # Les shards non encore traités sont migrés à leur premier accès
+        tenant_router.start_background_migration()
@@ -0,0 +1,132 @@
+"""
+Réponses HTTP spécialisées.
+"""
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from email.utils import formatdate
+from pathlib import Path
+from typing import Mapping, Optional, Tuple
+from urllib.parse import quote
+import anyio
+import os
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse un en-tête Range à plage unique ("bytes=0-499", "bytes=500-", "bytes=-500").
+
+    Returns:
+        (début, fin incluse), ou None si l'en-tête est absent, invalide ou
+        multi-plages (la réponse complète est alors servie).
+
+    Raises:
+        ValueError: si la plage n'est pas satisfiable (réponse 416).
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    if not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if first == "":
+        # Suffixe: les N derniers octets
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("Plage vide")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Plage hors du fichier")
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    """Vérifie un en-tête If-None-Match (comparaison faible)."""
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in [tag.removeprefix("W/") for tag in candidates]
+
+
+class RangeFileResponse(Response):
+    """
+    Sert un fichier avec ETag (304 Not Modified) et requêtes Range (206).
+
+    Le corps est envoyé via l'extension ASGI zerocopysend (sendfile) quand le
+    serveur la propose, sinon par blocs lus de manière asynchrone.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, path: Path, request_headers: Mapping[str, str], media_type: str,
+                 filename: Optional[str] = None, cache_control: str = "private, no-cache"):
+        self.path = Path(path)
+        self.media_type = media_type
+        self.background = None
+
+        stat = os.stat(self.path)
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": formatdate(stat.st_mtime, usegmt=True),
+            "cache-control": cache_control,
+        }
+        if filename:
+            headers["content-disposition"] = f"inline; filename*=utf-8''{quote(filename)}"
+
+        self.status_code = 200
+        self.start, self.length = 0, stat.st_size
+        if _etag_matches(request_headers.get("if-none-match"), etag):
+            self.status_code = 304
+            self.length = 0
+        elif request_headers.get("if-range", etag) == etag:
+            try:
+                byte_range = parse_range(request_headers.get("range"), stat.st_size)
+            except ValueError:
+                self.status_code = 416
+                self.length = 0
+                headers["content-range"] = f"bytes */{stat.st_size}"
+            else:
+                if byte_range is not None:
+                    self.status_code = 206
+                    self.start = byte_range[0]
+                    self.length = byte_range[1] - byte_range[0] + 1
+                    headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{stat.st_size}"
+
+        if self.status_code != 304:
+            headers["content-length"] = str(self.length)
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope["method"] == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, "rb") as file:
+                await file.seek(self.start)
+                remaining = self.length
+                more_body = True
+                while more_body:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    remaining -= len(chunk)
+                    more_body = remaining > 0 and bool(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, extract, func
+from typing import Optional
+import secrets
+
+from app.models import Expense, tenant_router
+from app.schemas import AdminSummary, TenantSummary, OCRStats
+from app.services import ocr_service
+from app.config import settings
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Vérifie le jeton d'administration (routes désactivées si ADMIN_TOKEN est vide)."""
+    if not settings.ADMIN_TOKEN or not secrets.compare_digest(x_admin_token or "", settings.ADMIN_TOKEN):
+        raise HTTPException(403, "Accès refusé")
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/tenants/summary", response_model=AdminSummary)
+async def tenants_summary(year: Optional[int] = Query(None, ge=2020, le=2100)):
+    """Agrège les dépenses de tous les tenants (une requête par shard, en parallèle)."""
+    if tenant_router is None:
+        raise HTTPException(400, "Le sharding par tenant n'est pas activé")
+    
+    async def summarize(db: AsyncSession):
+        query = select(func.count(Expense.id), func.coalesce(func.sum(Expense.amount_ttc), 0))
+        if year:
+            query = query.where(extract('year', Expense.date) == year)
+        return (await db.execute(query)).one()
+    
+    per_tenant = await tenant_router.fan_out(summarize)
+    tenants = [
+        TenantSummary(tenant_id=tenant_id, count=count, total_ttc=round(total, 2))
+        for tenant_id, (count, total) in per_tenant.items()
+    ]
+    return AdminSummary(
+        tenants=tenants,
+        count=sum(t.count for t in tenants),
+        total_ttc=round(sum(t.total_ttc for t in tenants), 2)
+    )
+
+@router.get("/ocr/stats", response_model=OCRStats)
+async def ocr_stats():
+    """Fréquence d'utilisation et durée moyenne de chaque niveau d'OCR (processus courant)."""
+    return ocr_service.stats()
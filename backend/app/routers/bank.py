@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+import csv
+
+from app.models import get_db
+from app.schemas import ReconciliationReport
+from app.services import bank_service
+from app.config import settings
+
+router = APIRouter(prefix="/bank", tags=["bank"])
+
+@router.post("/import", response_model=ReconciliationReport)
+async def import_statement(
+    file: UploadFile = File(...),
+    date_window: int = Query(3, ge=0, le=31),
+    encoding: str = Query("utf-8-sig"),
+    report_limit: int = Query(1000, ge=0, le=100000),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Importe un relevé bancaire (CSV ou OFX) et le rapproche des dépenses
+    (montant TTC identique, date à ±date_window jours, fournisseur similaire).
+    Les transactions déjà importées sont ignorées (`skipped`).
+    """
+    ext = file.filename.split('.')[-1].lower()
+    if ext not in settings.BANK_STATEMENT_EXTENSIONS:
+        raise HTTPException(400, f"Extension non supportée. Autorisées: {settings.BANK_STATEMENT_EXTENSIONS}")
+    
+    try:
+        import_id, imported, skipped = await bank_service.import_statement(
+            db, file.file, file.filename, encoding=encoding, user_id=db.info.get("tenant_id")
+        )
+    except (ValueError, LookupError, csv.Error) as e:
+        # LookupError: encodage inconnu; csv.Error: octet NUL, champ trop long...
+        await db.rollback()
+        raise HTTPException(400, f"Relevé illisible: {str(e)}")
+    
+    report = await bank_service.reconcile(db, import_id, date_window=date_window, report_limit=report_limit)
+    await db.commit()
+    return ORJSONResponse({"imported": imported, "skipped": skipped, **report})
@@ -1,22 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, UploadFile, File, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, RedirectResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, extract
+from sqlalchemy import select, update, delete, extract
 from typing import List, Optional
 from datetime import date, datetime
 from pathlib import Path
+import mimetypes
 import uuid
 import shutil
 
-from app.models import get_db, Expense
-from app.schemas import ExpenseCreate, ExpenseUpdate, ExpenseResponse, OCRResult
-from app.services import ocr_service, export_service
+from app.models import get_db, Expense, tenant_router, make_tenant_token
+from app.schemas import (
+    ExpenseCreate, ExpenseUpdate, ExpenseResponse, OCRResult,
+    ExpenseBatchSelection, ExpenseBatchUpdate, BatchResult, AnalyticsResponse, TenantToken
+)
+from app.services import (
+    ocr_service, export_service, thumbnail_service, storage_service, analytics_service, bank_service
+)
+from app.responses import RangeFileResponse
 from app.config import settings
 
 router = APIRouter(prefix="/expenses", tags=["expenses"])
 
 @router.post("/upload", response_model=ExpenseResponse)
 async def upload_expense(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db: AsyncSession = Depends(get_db)
 ):
@@ -27,17 +36,22 @@ async def upload_expense(
     if ext not in settings.ALLOWED_EXTENSIONS:
         raise HTTPException(400, f"Extension non supportée. Autorisées: {settings.ALLOWED_EXTENSIONS}")
     
-    # Sauvegarder le fichier
+    # Sauvegarder le fichier en zone de transit le temps de l'OCR
     file_id = str(uuid.uuid4())
-    file_path = settings.UPLOAD_DIR / f"{file_id}.{ext}"
+    file_path = storage_service.staging_path(f"{file_id}.{ext}")
     
     with open(file_path, "wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
     
+    file_key = None
     try:
         # Extraire les données via OCR
         extracted = ocr_service.extract_data(file_path)
         
+        # Stocker le fichier (recompression éventuelle + arborescence shardée);
+        # dans un thread: appels réseau bloquants avec le driver S3
+        file_key = await run_in_threadpool(storage_service.store, file_path)
+        
         # Créer l'expense
         expense = Expense(
             date=extracted.date.date() if extracted.date else date.today(),
@@ -47,7 +61,8 @@ async def upload_expense(
             amount_ttc=extracted.amount_ttc or 0,
             tva_rate=extracted.tva_rate,
             vendor=extracted.vendor,
-            file_path=str(file_path),
+            file_path=file_key,
+            user_id=db.info.get("tenant_id"),
             ocr_raw=extracted.raw_text[:5000]  # Limiter la taille
         )
         
@@ -55,13 +70,77 @@ async def upload_expense(
         await db.commit()
         await db.refresh(expense)
         
+        # Miniature générée après la réponse, à partir de l'image déjà décodée par l'OCR
+        background_tasks.add_task(thumbnail_service.generate, file_key, extracted.image)
+        
         return expense
         
     except Exception as e:
         # Nettoyer le fichier en cas d'erreur
         file_path.unlink(missing_ok=True)
+        if file_key:
+            await run_in_threadpool(storage_service.delete, file_key)
         raise HTTPException(500, f"Erreur lors de l'extraction: {str(e)}")
 
+def _apply_filters(query, month: Optional[int], year: Optional[int], category: Optional[str]):
+    """Applique les filtres de liste à une requête SELECT, UPDATE ou DELETE."""
+    if month:
+        query = query.where(extract('month', Expense.date) == month)
+    if year:
+        query = query.where(extract('year', Expense.date) == year)
+    if category:
+        query = query.where(Expense.category == category)
+    return query
+
+def _apply_selection(query, selection: ExpenseBatchSelection):
+    """Restreint une requête au lot sélectionné (ids ou filtre)."""
+    if selection.ids is not None:
+        return query.where(Expense.id.in_(selection.ids))
+    return _apply_filters(query, selection.filter.month, selection.filter.year, selection.filter.category)
+
+# Colonnes de ExpenseResponse, sélectionnées directement (sans objets ORM)
+_RESPONSE_COLUMNS = [getattr(Expense, name) for name in ExpenseResponse.model_fields]
+
+def _rows_to_dicts(result) -> List[dict]:
+    """Convertit des lignes brutes en dicts sérialisables par orjson."""
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+def _remove_files(file_keys: List[str]) -> None:
+    """Supprime les justificatifs et miniatures (exécuté après la réponse)."""
+    for file_key in file_keys:
+        storage_service.delete(file_key)
+        thumbnail_service.delete(file_key)
+
+@router.patch("/batch", response_model=BatchResult)
+async def update_expenses_batch(batch: ExpenseBatchUpdate, db: AsyncSession = Depends(get_db)):
+    """Met à jour un lot de dépenses en une seule requête UPDATE."""
+    changes = batch.changes.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(400, "Aucune modification fournie")
+    
+    query = _apply_selection(update(Expense), batch).values(**changes)
+    result = await db.execute(query.execution_options(synchronize_session=False))
+    await db.commit()
+    return BatchResult(count=result.rowcount)
+
+@router.delete("/batch", response_model=BatchResult)
+async def delete_expenses_batch(
+    selection: ExpenseBatchSelection,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """Supprime un lot de dépenses en une seule requête DELETE ... RETURNING."""
+    await bank_service.unlink_expenses(db, _apply_selection(select(Expense.id), selection))
+    query = _apply_selection(delete(Expense), selection).returning(Expense.file_path)
+    result = await db.execute(query.execution_options(synchronize_session=False))
+    file_keys = result.scalars().all()
+    await db.commit()
+    
+    # Fichiers supprimés après la réponse, une fois la transaction validée
+    background_tasks.add_task(_remove_files, [key for key in file_keys if key])
+    return BatchResult(count=len(file_keys))
+
 @router.get("/", response_model=List[ExpenseResponse])
 async def list_expenses(
     month: Optional[int] = Query(None, ge=1, le=12),
@@ -69,28 +148,94 @@ async def list_expenses(
     category: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Liste les dépenses avec filtres optionnels."""
-    query = select(Expense)
-    
-    if month:
-        query = query.where(extract('month', Expense.date) == month)
-    if year:
-        query = query.where(extract('year', Expense.date) == year)
-    if category:
-        query = query.where(Expense.category == category)
+    """
+    Liste les dépenses avec filtres optionnels.
     
+    Chemin rapide: tuples bruts (pas d'objets ORM), pas de re-validation
+    Pydantic ligne par ligne, encodage orjson.
+    """
+    query = _apply_filters(select(*_RESPONSE_COLUMNS), month, year, category)
     query = query.order_by(Expense.date.desc())
     result = await db.execute(query)
-    return result.scalars().all()
+    return ORJSONResponse(_rows_to_dicts(result))
+
+@router.get("/analytics", response_model=AnalyticsResponse)
+async def expense_analytics(
+    window: int = Query(3, ge=1, le=24),
+    outlier_threshold: float = Query(3.5, gt=0),
+    outlier_limit: int = Query(100, ge=0, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Tendances mensuelles par catégorie: totaux, moyenne mobile sur `window` mois,
+    évolution sur un an et dépenses atypiques (z-score robuste par catégorie).
+    """
+    trends = await analytics_service.trends(
+        db, window=window, outlier_threshold=outlier_threshold, outlier_limit=outlier_limit
+    )
+    return ORJSONResponse(trends)
+
+@router.get("/tenant-token", response_model=TenantToken)
+async def get_tenant_token(x_tenant_id: int = Header(..., ge=1)):
+    """
+    Jeton signé du tenant, à passer en paramètre `tenant_token` aux URL qui ne
+    peuvent pas porter l'en-tête X-Tenant-ID (justificatif, miniature, exports).
+    """
+    if tenant_router is None:
+        raise HTTPException(400, "Le sharding par tenant n'est pas activé")
+    return TenantToken(token=make_tenant_token(x_tenant_id), expires_in=settings.TENANT_TOKEN_TTL)
 
 @router.get("/{expense_id}", response_model=ExpenseResponse)
 async def get_expense(expense_id: int, db: AsyncSession = Depends(get_db)):
     """Récupère une dépense par ID."""
-    result = await db.execute(select(Expense).where(Expense.id == expense_id))
-    expense = result.scalar_one_or_none()
-    if not expense:
+    result = await db.execute(select(*_RESPONSE_COLUMNS).where(Expense.id == expense_id))
+    rows = _rows_to_dicts(result)
+    if not rows:
         raise HTTPException(404, "Dépense non trouvée")
-    return expense
+    return ORJSONResponse(rows[0])
+
+async def _get_file_key(expense_id: int, db: AsyncSession) -> str:
+    """Récupère la clé de stockage du justificatif (sans charger la ligne complète)."""
+    result = await db.execute(select(Expense.file_path).where(Expense.id == expense_id))
+    row = result.one_or_none()
+    if row is None:
+        raise HTTPException(404, "Dépense non trouvée")
+    if not row.file_path:
+        raise HTTPException(404, "Justificatif non trouvé")
+    return row.file_path
+
+def _generate_thumbnail(file_key: str) -> Path:
+    """Génère la miniature depuis le stockage (téléchargement si distant)."""
+    with storage_service.local_copy(file_key) as local_path:
+        return thumbnail_service.generate(local_path)
+
+@router.get("/{expense_id}/file")
+async def get_expense_file(expense_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    """Sert le justificatif original (ETag, requêtes Range)."""
+    file_key = await _get_file_key(expense_id, db)
+    file_path = storage_service.local_path(file_key)
+    if file_path is None:
+        # Stockage objet: le client télécharge directement (Range/ETag gérés par S3)
+        return RedirectResponse(await run_in_threadpool(storage_service.url, file_key))
+    if not file_path.is_file():
+        raise HTTPException(404, "Justificatif non trouvé")
+    media_type = mimetypes.guess_type(file_path.name)[0] or "application/octet-stream"
+    return RangeFileResponse(file_path, request.headers, media_type=media_type, filename=file_path.name)
+
+@router.get("/{expense_id}/thumbnail")
+async def get_expense_thumbnail(expense_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    """Sert la miniature WebP du justificatif (générée à la volée si absente)."""
+    file_key = await _get_file_key(expense_id, db)
+    thumb_path = thumbnail_service.thumbnail_path(file_key)
+    if not thumb_path.exists():
+        try:
+            thumb_path = await run_in_threadpool(_generate_thumbnail, file_key)
+        except FileNotFoundError:
+            raise HTTPException(404, "Justificatif non trouvé")
+    return RangeFileResponse(
+        thumb_path, request.headers, media_type="image/webp",
+        cache_control="private, max-age=86400"
+    )
 
 @router.put("/{expense_id}", response_model=ExpenseResponse)
 async def update_expense(
@@ -120,10 +265,12 @@ async def delete_expense(expense_id: int, db: AsyncSession = Depends(get_db)):
     if not expense:
         raise HTTPException(404, "Dépense non trouvée")
     
-    # Supprimer le fichier associé
+    # Supprimer le fichier associé et sa miniature
     if expense.file_path:
-        Path(expense.file_path).unlink(missing_ok=True)
+        await run_in_threadpool(storage_service.delete, expense.file_path)
+        thumbnail_service.delete(expense.file_path)
     
+    await bank_service.unlink_expenses(db, [expense.id])
     await db.delete(expense)
     await db.commit()
     return {"message": "Dépense supprimée"}
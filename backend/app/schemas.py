@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from enum import Enum
 
 class ExpenseCategory(str, Enum):
@@ -37,6 +37,105 @@ class ExpenseResponse(ExpenseBase):
     class Config:
         from_attributes = True
 
+class ExpenseFilter(BaseModel):
+    """Mêmes filtres que la liste des dépenses."""
+    month: Optional[int] = Field(None, ge=1, le=12)
+    year: Optional[int] = Field(None, ge=2020, le=2100)
+    category: Optional[str] = None
+
+class ExpenseBatchSelection(BaseModel):
+    """Sélection d'un lot de dépenses: liste d'ids ou filtre."""
+    ids: Optional[List[int]] = None
+    filter: Optional[ExpenseFilter] = None
+    
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Fournir soit 'ids', soit 'filter'")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True):
+            raise ValueError("Le filtre ne peut pas être vide")
+        return self
+
+class ExpenseBatchUpdate(ExpenseBatchSelection):
+    changes: ExpenseUpdate
+
+class BatchResult(BaseModel):
+    count: int
+
+class CategoryTrend(BaseModel):
+    category: str
+    totals: List[float]
+    moving_average: List[Optional[float]]
+    yoy_delta: List[Optional[float]]
+    yoy_pct: List[Optional[float]]
+
+class ExpenseOutlier(BaseModel):
+    id: int
+    category: str
+    month: str
+    amount_ttc: float
+    score: float
+
+class AnalyticsResponse(BaseModel):
+    months: List[str]
+    window: int
+    total: Optional[CategoryTrend] = None
+    categories: List[CategoryTrend]
+    outliers: List[ExpenseOutlier]
+
+class BankMatch(BaseModel):
+    transaction_id: int
+    expense_id: int
+    score: float
+
+class UnmatchedTransaction(BaseModel):
+    id: int
+    date: datetime.date
+    amount: float
+    label: Optional[str] = None
+
+class UnmatchedExpense(BaseModel):
+    id: int
+    date: datetime.date
+    amount_ttc: float
+    vendor: Optional[str] = None
+
+class ReconciliationReport(BaseModel):
+    import_id: str
+    imported: int
+    skipped: int
+    debits: int
+    matched: int
+    matches: List[BankMatch]
+    unmatched_transactions_count: int
+    unmatched_transactions: List[UnmatchedTransaction]
+    unmatched_expenses_count: int
+    unmatched_expenses: List[UnmatchedExpense]
+
+class OCRTierStats(BaseModel):
+    used: int
+    used_pct: float
+    runs: int
+    avg_seconds: float
+
+class OCRStats(BaseModel):
+    documents: int
+    tiers: Dict[str, OCRTierStats]
+
+class TenantToken(BaseModel):
+    token: str
+    expires_in: int
+
+class TenantSummary(BaseModel):
+    tenant_id: int
+    count: int
+    total_ttc: float
+
+class AdminSummary(BaseModel):
+    tenants: List[TenantSummary]
+    count: int
+    total_ttc: float
+
 class OCRResult(BaseModel):
     date: Optional[str] = None
     amount_ttc: Optional[float] = None
@@ -1,2 +1,27 @@
 from app.services.ocr_service import ocr_service, OCRService, ExtractedData
 from app.services.export_service import export_service, ExportService
+from app.services.thumbnail_service import thumbnail_service, ThumbnailService
+from app.services.storage_service import storage_service, StorageService, StorageDriver, LocalStorageDriver, S3StorageDriver
+from app.services.analytics_service import analytics_service, AnalyticsService, ExpenseColumns, compute_trends
+from app.services.bank_service import bank_service, BankService, ParsedTransaction
+
+
+def preload(*names: str) -> None:
+    """
+    Charge à l'avance les dépendances lourdes des services.
+
+    Par défaut rien n'est importé avant la première utilisation; un worker dédié
+    (OCR, exports) peut appeler preload("ocr", "export") au démarrage pour ne pas
+    faire payer ce coût à la première requête.
+    """
+    services = {
+        "ocr": ocr_service,
+        "export": export_service,
+        "thumbnail": thumbnail_service,
+        "storage": storage_service,
+        "analytics": analytics_service,
+    }
+    for name in names or services:
+        if name not in services:
+            raise ValueError(f"Service inconnu: {name}. Disponibles: {', '.join(services)}")
+        services[name].warm_up()
@@ -0,0 +1,273 @@
+"""
+Service d'analyse des dépenses (tendances mensuelles, moyennes mobiles,
+évolutions sur un an, dépenses atypiques).
+
+Les colonnes utiles (id, mois, catégorie, montant TTC en centimes) sont chargées
+en une requête dans des tableaux NumPy, mises en cache par tenant avec les
+résultats déjà calculés, et invalidées à chaque écriture sur les dépenses. Tous
+les calculs sont vectorisés et exécutés hors de la boucle d'événements.
+"""
+from sqlalchemy import event, extract, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+import anyio
+import time
+
+from app.config import settings
+from app.models.expense import Expense, ExpenseCategory
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# NumPy est importé à la première utilisation (cf. preload("analytics")).
+
+
+@dataclass
+class ExpenseColumns:
+    """Colonnes des dépenses d'un tenant, au format colonnaire."""
+    ids: "np.ndarray"          # int64
+    months: "np.ndarray"       # int32, année * 12 + (mois - 1)
+    categories: "np.ndarray"   # int32, index dans category_names
+    cents: "np.ndarray"        # int64, montant TTC en centimes
+    category_names: List[str]
+    loaded_at: float
+    # Résultats de compute_trends par (window, outlier_threshold, outlier_limit)
+    trends: Dict[Tuple, dict] = field(default_factory=dict)
+
+
+def _group_median(codes: "np.ndarray", values: "np.ndarray", n_groups: int) -> "np.ndarray":
+    """Médiane de `values` par groupe (chaque groupe doit être non vide)."""
+    import numpy as np
+
+    order = np.lexsort((values, codes))
+    sorted_values = values[order]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lower = sorted_values[starts + (counts - 1) // 2]
+    upper = sorted_values[starts + counts // 2]
+    return (lower + upper) / 2
+
+
+def _moving_average(series: "np.ndarray", window: int) -> "np.ndarray":
+    """Moyenne mobile sur la dernière dimension (NaN tant que la fenêtre est incomplète)."""
+    import numpy as np
+
+    result = np.full(series.shape, np.nan)
+    if window <= series.shape[-1]:
+        padded = np.concatenate((np.zeros(series.shape[:-1] + (1,)), np.cumsum(series, axis=-1)), axis=-1)
+        result[..., window - 1:] = (padded[..., window:] - padded[..., :-window]) / window
+    return result
+
+
+def _year_over_year(series: "np.ndarray") -> tuple:
+    """Écart et variation (%) par rapport au même mois de l'année précédente."""
+    import numpy as np
+
+    delta = np.full(series.shape, np.nan)
+    pct = np.full(series.shape, np.nan)
+    if series.shape[-1] > 12:
+        previous = series[..., :-12]
+        delta[..., 12:] = series[..., 12:] - previous
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct[..., 12:] = np.where(previous > 0, delta[..., 12:] / previous * 100, np.nan)
+    return delta, pct
+
+
+def _to_euros(values: "np.ndarray") -> list:
+    """Centimes -> euros arrondis (NaN sérialisé en null par orjson)."""
+    import numpy as np
+
+    return np.round(values / 100, 2).tolist()
+
+
+def compute_trends(columns: ExpenseColumns, window: int = 3,
+                   outlier_threshold: float = 3.5, outlier_limit: int = 100) -> dict:
+    """
+    Calcule les tendances mensuelles par catégorie.
+
+    Args:
+        columns: Données colonnaires d'un tenant.
+        window: Taille de la moyenne mobile (en mois).
+        outlier_threshold: Seuil du z-score robuste (médiane/MAD par catégorie).
+        outlier_limit: Nombre maximum de dépenses atypiques retournées.
+    """
+    import numpy as np
+
+    if len(columns.ids) == 0:
+        return {"months": [], "window": window, "total": None, "categories": [], "outliers": []}
+
+    # Totaux mensuels par catégorie: un seul bincount sur (catégorie, mois)
+    first_month = int(columns.months.min())
+    n_months = int(columns.months.max()) - first_month + 1
+    n_categories = len(columns.category_names)
+    month_offsets = columns.months - first_month
+    monthly = np.bincount(
+        columns.categories.astype(np.int64) * n_months + month_offsets,
+        weights=columns.cents, minlength=n_categories * n_months
+    ).reshape(n_categories, n_months)
+    total = monthly.sum(axis=0)
+
+    moving = _moving_average(monthly, window)
+    delta, pct = _year_over_year(monthly)
+    total_moving = _moving_average(total, window)
+    total_delta, total_pct = _year_over_year(total)
+
+    # Dépenses atypiques: z-score robuste par catégorie
+    amounts = columns.cents.astype(np.float64)
+    medians = _group_median(columns.categories, amounts, n_categories)
+    deviations = np.abs(amounts - medians[columns.categories])
+    mads = _group_median(columns.categories, deviations, n_categories)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(mads[columns.categories] > 0,
+                          0.6745 * (amounts - medians[columns.categories]) / mads[columns.categories], 0.0)
+    flagged = np.flatnonzero(np.abs(scores) > outlier_threshold)
+    flagged = flagged[np.argsort(-np.abs(scores[flagged]), kind="stable")][:outlier_limit]
+
+    months = [f"{m // 12}-{m % 12 + 1:02d}" for m in range(first_month, first_month + n_months)]
+    return {
+        "months": months,
+        "window": window,
+        "total": {
+            "category": "total",
+            "totals": _to_euros(total),
+            "moving_average": _to_euros(total_moving),
+            "yoy_delta": _to_euros(total_delta),
+            "yoy_pct": np.round(total_pct, 1).tolist(),
+        },
+        "categories": [
+            {
+                "category": name,
+                "totals": _to_euros(monthly[i]),
+                "moving_average": _to_euros(moving[i]),
+                "yoy_delta": _to_euros(delta[i]),
+                "yoy_pct": np.round(pct[i], 1).tolist(),
+            }
+            for i, name in enumerate(columns.category_names)
+        ],
+        "outliers": [
+            {
+                "id": int(columns.ids[i]),
+                "category": columns.category_names[columns.categories[i]],
+                "month": months[month_offsets[i]],
+                "amount_ttc": round(int(columns.cents[i]) / 100, 2),
+                "score": round(float(scores[i]), 2),
+            }
+            for i in flagged
+        ],
+    }
+
+
+class AnalyticsService:
+    """Charge et met en cache, par tenant, les colonnes de dépenses et les tendances calculées."""
+
+    # Variantes de paramètres gardées en cache par tenant
+    MAX_TRENDS_PER_TENANT = 16
+
+    def __init__(self, max_tenants: int = 32, ttl: float = 300):
+        self.max_tenants = max_tenants
+        # Borne la péremption quand plusieurs workers écrivent (l'invalidation est locale au processus)
+        self.ttl = ttl
+        self._cache: "OrderedDict[Optional[int], ExpenseColumns]" = OrderedDict()
+        # Incrémenté à chaque invalidation: un chargement commencé avant n'est pas mis en cache
+        self._versions: Dict[Optional[int], int] = {}
+
+    def warm_up(self) -> None:
+        """Précharge NumPy."""
+        import numpy  # noqa: F401
+
+    def invalidate(self, tenant_id: Optional[int]) -> None:
+        self._versions[tenant_id] = self._versions.get(tenant_id, 0) + 1
+        self._cache.pop(tenant_id, None)
+
+    @staticmethod
+    def _to_columns(rows: Sequence) -> ExpenseColumns:
+        import numpy as np
+
+        count = len(rows)
+        # Encodage dictionnaire des catégories (peu de valeurs distinctes)
+        codes = {}
+        default = ExpenseCategory.AUTRE.value
+        categories = np.fromiter(
+            (codes.setdefault(row[2] or default, len(codes)) for row in rows), dtype=np.int32, count=count
+        )
+        return ExpenseColumns(
+            ids=np.fromiter((row[0] for row in rows), dtype=np.int64, count=count),
+            months=np.fromiter((row[1] for row in rows), dtype=np.int32, count=count),
+            categories=categories,
+            cents=np.rint(np.fromiter((row[3] or 0 for row in rows), dtype=np.float64, count=count) * 100)
+                    .astype(np.int64),
+            category_names=list(codes),
+            loaded_at=time.monotonic(),
+        )
+
+    async def _load(self, db: AsyncSession) -> ExpenseColumns:
+        month_index = extract('year', Expense.date) * 12 + extract('month', Expense.date) - 1
+        result = await db.execute(select(Expense.id, month_index, Expense.category, Expense.amount_ttc))
+        rows = result.all()
+        # Conversion en tableaux dans un thread: ne bloque pas les autres requêtes
+        return await anyio.to_thread.run_sync(self._to_columns, rows)
+
+    async def get_columns(self, db: AsyncSession) -> ExpenseColumns:
+        """Colonnes du tenant de la session, depuis le cache si valide."""
+        tenant_id = db.info.get("tenant_id")
+        columns = self._cache.get(tenant_id)
+        if columns is not None and time.monotonic() - columns.loaded_at < self.ttl:
+            self._cache.move_to_end(tenant_id)
+            return columns
+
+        version = self._versions.get(tenant_id, 0)
+        columns = await self._load(db)
+        if self._versions.get(tenant_id, 0) != version:
+            # Écriture validée pendant le chargement: résultat utilisable mais pas mis en cache
+            return columns
+        self._cache[tenant_id] = columns
+        self._cache.move_to_end(tenant_id)
+        while len(self._cache) > self.max_tenants:
+            self._cache.popitem(last=False)
+        return columns
+
+    async def trends(self, db: AsyncSession, window: int = 3,
+                     outlier_threshold: float = 3.5, outlier_limit: int = 100) -> dict:
+        """Tendances du tenant de la session (calculées hors de la boucle, puis mises en cache)."""
+        columns = await self.get_columns(db)
+        key = (window, outlier_threshold, outlier_limit)
+        trends = columns.trends.get(key)
+        if trends is None:
+            trends = await anyio.to_thread.run_sync(
+                compute_trends, columns, window, outlier_threshold, outlier_limit
+            )
+            if len(columns.trends) >= self.MAX_TRENDS_PER_TENANT:
+                columns.trends.pop(next(iter(columns.trends)))
+            columns.trends[key] = trends
+        return trends
+
+
+# Instance singleton
+analytics_service = AnalyticsService(settings.ANALYTICS_CACHE_SIZE, settings.ANALYTICS_CACHE_TTL)
+
+
+# Invalidation: toute écriture validée sur les dépenses vide le cache du tenant
+@event.listens_for(Session, "after_flush")
+def _mark_flush(session, flush_context):
+    if any(isinstance(obj, Expense) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info["analytics_stale"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    # Seules les écritures sur la table des dépenses (ORM ou Core) comptent, pas
+    # celles d'autres tables dans la même session (ex: import de relevé bancaire)
+    if orm_execute_state.statement.entity_description.get("table") is Expense.__table__:
+        orm_execute_state.session.info["analytics_stale"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("analytics_stale", False):
+        analytics_service.invalidate(session.info.get("tenant_id"))
@@ -0,0 +1,434 @@
+"""
+Import de relevés bancaires (CSV, OFX) et rapprochement avec les dépenses.
+
+Le relevé est lu en flux et inséré par lots (executemany, COPY sur PostgreSQL);
+les transactions déjà importées (même FITID, ou même date/montant/libellé) sont
+ignorées, ce qui permet de réimporter un relevé ou des relevés qui se chevauchent.
+Le rapprochement indexe les dépenses par montant TTC (en centimes) puis par date:
+chaque transaction ne compare que les dépenses de même montant dans la fenêtre
+de dates, au lieu de toutes les dépenses.
+"""
+from sqlalchemy import select, insert, update, bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from difflib import SequenceMatcher
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO, Tuple
+import csv
+import io
+import re
+import unicodedata
+import uuid
+
+from app.models.bank_transaction import BankTransaction
+from app.models.expense import Expense
+
+
+# Mots sans valeur pour comparer un libellé bancaire à un fournisseur
+_LABEL_NOISE = {"CB", "CARTE", "PAIEMENT", "PAIEMT", "PRLV", "SEPA", "VIR", "ACHAT", "FACTURE", "DU", "LE", "LA", "DE"}
+
+
+class _SemicolonDialect(csv.excel):
+    """Dialecte par défaut des exports bancaires français."""
+    delimiter = ";"
+
+
+@dataclass
+class ParsedTransaction:
+    """Transaction lue dans un relevé."""
+    date: date
+    amount: float  # Négatif = débit
+    label: Optional[str] = None
+    reference: Optional[str] = None
+
+
+def _strip_accents(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def normalize_label(text: Optional[str]) -> str:
+    """Majuscules sans accents, sans ponctuation, chiffres ni mots-outils bancaires."""
+    if not text:
+        return ""
+    text = re.sub(r"[^A-Z0-9 ]", " ", _strip_accents(text).upper())
+    return " ".join(tok for tok in text.split() if not tok.isdigit() and tok not in _LABEL_NOISE)
+
+
+def _normalize_header(text: str) -> str:
+    """En-tête CSV en minuscules sans accents ni ponctuation ("Montant (€)" -> "montant")."""
+    return " ".join(re.sub(r"[^a-z]", " ", _strip_accents(text).lower()).split())
+
+
+def parse_amount(value: Optional[str]) -> Optional[float]:
+    """Parse un montant bancaire ("-1 234,56", "1.234,56", "-12.50 €")."""
+    if not value:
+        return None
+    value = re.sub(r"[\s €]|EUR", "", value)
+    if not value:
+        return None
+    if "," in value and "." in value:
+        # Le dernier séparateur est le séparateur décimal
+        if value.rfind(",") > value.rfind("."):
+            value = value.replace(".", "").replace(",", ".")
+        else:
+            value = value.replace(",", "")
+    else:
+        value = value.replace(",", ".")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_date(value: Optional[str]) -> Optional[date]:
+    """Parse une date de relevé (formats français et ISO)."""
+    if not value:
+        return None
+    value = value.strip()
+    for fmt in ("%d/%m/%Y", "%d/%m/%y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+class BankService:
+    """Import de relevés et rapprochement transactions / dépenses."""
+
+    # En-têtes CSV reconnus (normalisés, sans accents)
+    _DATE_HEADERS = ("date operation", "date de l operation", "date", "booking date", "date valeur")
+    _LABEL_HEADERS = ("libelle", "label", "description", "detail", "intitule")
+    _AMOUNT_HEADERS = ("montant", "amount")
+    _DEBIT_HEADERS = ("debit",)
+    _CREDIT_HEADERS = ("credit",)
+
+    _OFX_TOKEN = re.compile(r"<(/?)(\w+)>([^<]*)")
+
+    def __init__(self, batch_size: int = 1000, min_similarity: float = 0.4):
+        self.batch_size = batch_size
+        self.min_similarity = min_similarity
+
+    # --- Lecture des relevés -------------------------------------------------
+
+    @staticmethod
+    def _find_column(headers: List[str], candidates: Tuple[str, ...]) -> Optional[int]:
+        for candidate in candidates:
+            for i, header in enumerate(headers):
+                if header == candidate or header.startswith(candidate + " "):
+                    return i
+        return None
+
+    def parse_csv(self, stream: TextIO) -> Iterator[ParsedTransaction]:
+        """Lit un export CSV en flux (séparateur détecté, lignes d'en-tête de compte ignorées)."""
+        sample = stream.read(8192)
+        stream.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t|")
+        except csv.Error:
+            dialect = _SemicolonDialect
+        reader = csv.reader(stream, dialect)
+
+        # Chercher la ligne d'en-têtes parmi les premières lignes
+        columns = None
+        for _, row in zip(range(30), reader):
+            headers = [_normalize_header(h) for h in row]
+            date_col = self._find_column(headers, self._DATE_HEADERS)
+            amount_col = self._find_column(headers, self._AMOUNT_HEADERS)
+            debit_col = self._find_column(headers, self._DEBIT_HEADERS)
+            credit_col = self._find_column(headers, self._CREDIT_HEADERS)
+            if date_col is not None and (amount_col is not None or debit_col is not None):
+                columns = (date_col, self._find_column(headers, self._LABEL_HEADERS),
+                           amount_col, debit_col, credit_col)
+                break
+        if columns is None:
+            raise ValueError("en-têtes CSV non reconnus (date et montant requis)")
+
+        date_col, label_col, amount_col, debit_col, credit_col = columns
+
+        def cell(row: List[str], col: Optional[int]) -> Optional[str]:
+            return row[col] if col is not None and col < len(row) else None
+
+        for row in reader:
+            day = parse_date(cell(row, date_col))
+            if day is None:
+                continue
+            if amount_col is not None:
+                amount = parse_amount(cell(row, amount_col))
+            else:
+                debit = parse_amount(cell(row, debit_col))
+                credit = parse_amount(cell(row, credit_col))
+                amount = None if debit is None and credit is None else (credit or 0) - abs(debit or 0)
+            if amount is None:
+                continue
+            label = cell(row, label_col)
+            yield ParsedTransaction(date=day, amount=amount, label=label.strip()[:500] if label else None)
+
+    def parse_ofx(self, stream: TextIO) -> Iterator[ParsedTransaction]:
+        """Lit un fichier OFX/QFX en flux (SGML 1.x avec ou sans balises fermantes, ou XML 2.x)."""
+        current: Optional[Dict[str, str]] = None
+        for line in stream:
+            for closing, tag, value in self._OFX_TOKEN.findall(line):
+                tag = tag.upper()
+                if tag == "STMTTRN" or (tag == "BANKTRANLIST" and closing):
+                    if current:
+                        transaction = self._ofx_transaction(current)
+                        if transaction is not None:
+                            yield transaction
+                    current = {} if tag == "STMTTRN" and not closing else None
+                elif current is not None and not closing:
+                    current[tag] = value.strip()
+
+    @staticmethod
+    def _ofx_transaction(fields: Dict[str, str]) -> Optional[ParsedTransaction]:
+        posted = fields.get("DTPOSTED", "")[:8]
+        amount = parse_amount(fields.get("TRNAMT"))
+        try:
+            day = datetime.strptime(posted, "%Y%m%d").date()
+        except ValueError:
+            return None
+        if amount is None:
+            return None
+        label = " ".join(filter(None, (fields.get("NAME"), fields.get("MEMO"))))
+        return ParsedTransaction(
+            date=day, amount=amount, label=label[:500] or None, reference=fields.get("FITID")
+        )
+
+    # --- Import ----------------------------------------------------------------
+
+    async def _bulk_insert(self, db: AsyncSession, rows: List[dict]) -> None:
+        """Insère un lot: COPY avec asyncpg, executemany sinon."""
+        conn = await db.connection()
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "asyncpg":
+            # COPY passe par la connexion asyncpg brute, que l'adaptateur n'ouvre en
+            # transaction qu'à la première requête SQL: sans cela, les lignes seraient
+            # validées immédiatement et survivraient à un rollback de la session
+            await conn.execute(text("SELECT 1"))
+            schema_map = conn.sync_connection.get_execution_options().get("schema_translate_map") or {}
+            columns = list(rows[0])
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                BankTransaction.__tablename__,
+                records=[tuple(row[c] for c in columns) for row in rows],
+                columns=columns,
+                schema_name=schema_map.get(None),
+            )
+        else:
+            await db.execute(insert(BankTransaction), rows)
+
+    @staticmethod
+    def _dedupe_key(day: date, amount: float, label: Optional[str], reference: Optional[str]) -> tuple:
+        """Identité d'une transaction: FITID si présent, sinon date, montant et libellé."""
+        if reference:
+            return ("ref", reference)
+        return ("line", day, round(amount * 100), label or "")
+
+    async def _new_transactions(self, db: AsyncSession, import_id: str, batch: List[dict],
+                                seen: Counter) -> List[dict]:
+        """
+        Filtre les transactions déjà importées.
+
+        Compare des nombres d'occurrences: deux lignes identiques d'un même relevé
+        (deux achats le même jour) sont gardées, mais pas réimportées.
+        """
+        existing = Counter(
+            self._dedupe_key(*row) for row in await db.execute(
+                select(BankTransaction.date, BankTransaction.amount,
+                       BankTransaction.label, BankTransaction.reference)
+                .where(
+                    BankTransaction.date.between(min(r["date"] for r in batch), max(r["date"] for r in batch)),
+                    BankTransaction.import_id != import_id,
+                )
+            )
+        )
+        new_rows = []
+        for row in batch:
+            key = self._dedupe_key(row["date"], row["amount"], row["label"], row["reference"])
+            seen[key] += 1
+            if seen[key] > existing[key]:
+                new_rows.append(row)
+        return new_rows
+
+    async def import_statement(self, db: AsyncSession, fileobj: BinaryIO, filename: str,
+                               encoding: str = "utf-8-sig",
+                               user_id: Optional[int] = None) -> Tuple[str, int, int]:
+        """
+        Importe un relevé dans la transaction courante (sans commit).
+
+        Returns:
+            (identifiant du lot d'import, transactions insérées, doublons ignorés)
+        """
+        import_id = str(uuid.uuid4())
+        is_ofx = filename.lower().endswith((".ofx", ".qfx"))
+        stream = io.TextIOWrapper(fileobj, encoding=encoding, errors="replace", newline="")
+        seen: Counter = Counter()
+        count = skipped = 0
+
+        async def flush(batch: List[dict]) -> None:
+            nonlocal count, skipped
+            new_rows = await self._new_transactions(db, import_id, batch, seen)
+            if new_rows:
+                await self._bulk_insert(db, new_rows)
+            count += len(new_rows)
+            skipped += len(batch) - len(new_rows)
+
+        try:
+            parser = self.parse_ofx(stream) if is_ofx else self.parse_csv(stream)
+            batch = []
+            for transaction in parser:
+                batch.append({
+                    "import_id": import_id,
+                    "date": transaction.date,
+                    "amount": transaction.amount,
+                    "label": transaction.label,
+                    "reference": transaction.reference,
+                    "user_id": user_id,
+                })
+                if len(batch) >= self.batch_size:
+                    await flush(batch)
+                    batch = []
+            if batch:
+                await flush(batch)
+        finally:
+            # Ne pas fermer le fichier de l'upload avec le wrapper texte
+            stream.detach()
+        return import_id, count, skipped
+
+    # --- Rapprochement -----------------------------------------------------------
+
+    async def unlink_expenses(self, db: AsyncSession, expense_ids) -> None:
+        """
+        Détache les transactions rapprochées des dépenses sur le point d'être supprimées
+        (dans la transaction courante).
+
+        ondelete="SET NULL" n'est pas appliqué par SQLite (clés étrangères inactives):
+        sans cela, un lien orphelin désignerait la prochaine dépense qui réutilise l'id.
+
+        Args:
+            expense_ids: Liste d'ids ou sous-requête SELECT d'ids.
+        """
+        await db.execute(
+            update(BankTransaction)
+            .where(BankTransaction.expense_id.in_(expense_ids))
+            .values(expense_id=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    def vendor_similarity(self, vendor: str, label: str) -> float:
+        """Similarité (0-1) entre un fournisseur et un libellé, tous deux normalisés."""
+        if not vendor or not label:
+            return 0.0
+        tokens = [tok for tok in vendor.split() if len(tok) >= 3]
+        label_tokens = set(label.split())
+        overlap = sum(tok in label_tokens for tok in tokens) / len(tokens) if tokens else 0.0
+        if overlap == 1.0:
+            return overlap
+        return max(overlap, SequenceMatcher(None, vendor, label).ratio())
+
+    async def reconcile(self, db: AsyncSession, import_id: str, date_window: int = 3,
+                        report_limit: int = 1000) -> dict:
+        """
+        Rapproche les débits d'un lot d'import des dépenses non encore rapprochées.
+
+        Une dépense est candidate si son TTC est égal au débit (au centime) et si
+        sa date est dans ±date_window jours. Les paires candidates sont triées par
+        score (similarité fournisseur/libellé + proximité de date) puis attribuées
+        de façon gloutonne, chaque transaction et chaque dépense au plus une fois.
+        Les rapprochements sont enregistrés dans la transaction courante (sans commit).
+        """
+        transactions = (await db.execute(
+            select(BankTransaction.id, BankTransaction.date, BankTransaction.amount, BankTransaction.label)
+            .where(BankTransaction.import_id == import_id, BankTransaction.amount < 0)
+        )).all()
+        if not transactions:
+            return self._report(import_id, [], [], [], [], report_limit)
+
+        linked = select(BankTransaction.expense_id).where(BankTransaction.expense_id.isnot(None))
+        window = timedelta(days=date_window)
+        expenses = (await db.execute(
+            select(Expense.id, Expense.date, Expense.amount_ttc, Expense.vendor)
+            .where(
+                Expense.date.between(min(t.date for t in transactions) - window,
+                                     max(t.date for t in transactions) + window),
+                Expense.id.not_in(linked),
+            )
+        )).all()
+
+        # Index: montant en centimes -> dépenses triées par date
+        buckets: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for i, expense in enumerate(expenses):
+            buckets[round(expense.amount_ttc * 100)].append((expense.date.toordinal(), i))
+        ordinals = {}
+        for cents, bucket in buckets.items():
+            bucket.sort()
+            ordinals[cents] = [ordinal for ordinal, _ in bucket]
+        vendors = [normalize_label(expense.vendor) for expense in expenses]
+
+        candidates = []
+        for t_index, transaction in enumerate(transactions):
+            cents = round(-transaction.amount * 100)
+            bucket = buckets.get(cents)
+            if not bucket:
+                continue
+            day = transaction.date.toordinal()
+            lo = bisect_left(ordinals[cents], day - date_window)
+            hi = bisect_right(ordinals[cents], day + date_window)
+            label = normalize_label(transaction.label)
+            for ordinal, e_index in bucket[lo:hi]:
+                similarity = self.vendor_similarity(vendors[e_index], label)
+                # Sans fournisseur connu, montant et date suffisent
+                if vendors[e_index] and similarity < self.min_similarity:
+                    continue
+                score = similarity + 1 - abs(ordinal - day) / (date_window + 1)
+                candidates.append((score, t_index, e_index))
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        used_transactions, used_expenses, matches = set(), set(), []
+        for score, t_index, e_index in candidates:
+            if t_index in used_transactions or e_index in used_expenses:
+                continue
+            used_transactions.add(t_index)
+            used_expenses.add(e_index)
+            matches.append((transactions[t_index].id, expenses[e_index].id, round(score, 3)))
+
+        if matches:
+            table = BankTransaction.__table__
+            await db.execute(
+                table.update().where(table.c.id == bindparam("_id")).values(expense_id=bindparam("_expense_id")),
+                [{"_id": t_id, "_expense_id": e_id} for t_id, e_id, _ in matches]
+            )
+
+        unmatched_transactions = [t for i, t in enumerate(transactions) if i not in used_transactions]
+        unmatched_expenses = [e for i, e in enumerate(expenses) if i not in used_expenses]
+        return self._report(import_id, transactions, matches, unmatched_transactions,
+                            unmatched_expenses, report_limit)
+
+    @staticmethod
+    def _report(import_id, transactions, matches, unmatched_transactions,
+                unmatched_expenses, report_limit) -> dict:
+        return {
+            "import_id": import_id,
+            "debits": len(transactions),
+            "matched": len(matches),
+            "matches": [
+                {"transaction_id": t_id, "expense_id": e_id, "score": score}
+                for t_id, e_id, score in matches[:report_limit]
+            ],
+            "unmatched_transactions_count": len(unmatched_transactions),
+            "unmatched_transactions": [
+                {"id": t.id, "date": t.date, "amount": t.amount, "label": t.label}
+                for t in unmatched_transactions[:report_limit]
+            ],
+            "unmatched_expenses_count": len(unmatched_expenses),
+            "unmatched_expenses": [
+                {"id": e.id, "date": e.date, "amount_ttc": e.amount_ttc, "vendor": e.vendor}
+                for e in unmatched_expenses[:report_limit]
+            ],
+        }
+
+
+# Instance singleton
+bank_service = BankService()
@@ -3,19 +3,26 @@ from datetime import date, datetime
 from typing import List
 import io
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from weasyprint import HTML, CSS
-
 from app.models.expense import Expense
 
+# openpyxl et weasyprint (pango/cairo) sont importés à la première utilisation:
+# les workers qui ne servent que l'API n'en paient ni le temps ni la mémoire.
+
 class ExportService:
     def __init__(self, output_dir: Path = Path("exports")):
         self.output_dir = output_dir
+    
+    def warm_up(self) -> None:
+        """Précharge openpyxl et weasyprint (workers dédiés aux exports)."""
+        import openpyxl  # noqa: F401
+        import weasyprint  # noqa: F401
         self.output_dir.mkdir(exist_ok=True)
     
     def generate_excel(self, expenses: List[Expense], month: int, year: int) -> io.BytesIO:
         """Génère un fichier Excel avec les dépenses du mois."""
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+        
         wb = Workbook()
         ws = wb.active
         ws.title = f"Note de frais {month:02d}/{year}"
@@ -82,6 +89,7 @@ class ExportService:
     def generate_pdf(self, expenses: List[Expense], month: int, year: int, 
                      name: str = "Thomas Belardy") -> io.BytesIO:
         """Génère un PDF de note de frais."""
+        from weasyprint import HTML
         
         # Calculer totaux
         total_ht = sum(e.amount_ht or 0 for e in expenses)
@@ -1,16 +1,26 @@
 """
 OCR Service pour l'extraction de données des tickets de caisse.
 Supporte les tickets multi-TVA (5.5%, 10%, 20%).
+
+Mode par niveaux: une passe rapide (image réduite, une langue, PSM 6) puis
+une passe complète seulement si le résultat n'est pas exploitable.
 """
-import pytesseract
-from PIL import Image, ImageOps
-from pdf2image import convert_from_path
 from pathlib import Path
+import math
 import re
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List
+from typing import TYPE_CHECKING, Optional, List, Tuple
 from dataclasses import dataclass, field
 
+from app.config import settings
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# pytesseract, Pillow et pdf2image sont importés à la première utilisation:
+# les workers qui ne font pas d'OCR n'en paient ni le temps ni la mémoire.
 
 @dataclass
 class VATLine:
@@ -39,6 +49,11 @@ class ExtractedData:
     # Nouveau: détail multi-TVA
     vat_lines: List[VATLine] = field(default_factory=list)
     vat_validated: bool = False  # True si les calculs sont cohérents
+    # Niveau d'OCR retenu et confiance moyenne par mot (passe rapide uniquement)
+    ocr_tier: Optional[str] = None
+    confidence: Optional[float] = None
+    # Image décodée (première page) réutilisable pour la miniature
+    image: Optional["Image.Image"] = field(default=None, repr=False, compare=False)
 
 
 class OCRService:
@@ -57,36 +72,102 @@ class OCRService:
         re.IGNORECASE
     )
     
-    def __init__(self, lang: str = "fra+eng"):
+    # Niveaux d'OCR, du moins coûteux au plus coûteux
+    TIER_FAST = "fast"            # Image réduite, première langue, PSM 6, confiance par mot
+    TIER_FULL = "full"            # Pleine résolution, toutes les langues, PSM 3 (défaut)
+    TIER_ALTERNATE = "alternate"  # Pleine résolution, toutes les langues, PSM 4
+    TIERS = [TIER_FAST, TIER_FULL, TIER_ALTERNATE]
+    # Départage des résultats équivalents: la passe complète (comportement historique)
+    # d'abord, la passe rapide (image réduite, une langue) en dernier
+    TIE_PREFERENCE = {TIER_FULL: 2, TIER_ALTERNATE: 1, TIER_FAST: 0}
+    
+    def __init__(self, lang: str = "fra+eng", tiered: bool = True,
+                 fast_max_side: int = 1600, min_confidence: float = 70.0):
         self.lang = lang
+        self.tiered = tiered
+        self.fast_max_side = fast_max_side
+        self.min_confidence = min_confidence
+        self._stats_lock = threading.Lock()
+        self._documents = 0
+        self._tier_stats = {tier: {"used": 0, "runs": 0, "seconds": 0.0} for tier in self.TIERS}
     
-    def extract_text_from_image(self, image_path: Path) -> str:
-        """Extrait le texte d'une image."""
-        image = Image.open(image_path)
+    def warm_up(self) -> None:
+        """Précharge les dépendances OCR (workers dédiés à l'OCR)."""
+        import pytesseract  # noqa: F401
+        import pdf2image  # noqa: F401
+        from PIL import Image  # noqa: F401
+    
+    def load_images(self, file_path: Path) -> List["Image.Image"]:
+        """Décode le document en images (une par page pour les PDF)."""
+        from PIL import Image, ImageOps
+        from pdf2image import convert_from_path
+        
+        if file_path.suffix.lower() == ".pdf":
+            return convert_from_path(file_path)
+        image = Image.open(file_path)
         # Auto-orientation basée sur les métadonnées EXIF
         image = ImageOps.exif_transpose(image)
         # Convertir en RGB si nécessaire (pour les images RGBA ou P)
         if image.mode not in ('L', 'RGB'):
             image = image.convert('RGB')
-        text = pytesseract.image_to_string(image, lang=self.lang)
-        return text
+        return [image]
+    
+    def extract_text_from_images(self, images: List["Image.Image"]) -> str:
+        """Extrait le texte d'images déjà décodées."""
+        import pytesseract
+        
+        return "\n".join(pytesseract.image_to_string(image, lang=self.lang) for image in images)
+    
+    def _downscale(self, image: "Image.Image") -> "Image.Image":
+        """Réduction entière (rapide) pour que le plus grand côté tienne dans fast_max_side."""
+        factor = math.ceil(max(image.size) / self.fast_max_side)
+        return image.reduce(factor) if factor > 1 else image
+    
+    def extract_text_fast(self, images: List["Image.Image"]) -> Tuple[str, Optional[float]]:
+        """
+        Passe rapide: image réduite, première langue seulement, PSM 6.
+        
+        Returns:
+            Texte reconstruit ligne par ligne et confiance moyenne des mots (0-100).
+        """
+        import pytesseract
+        
+        lang = self.lang.split("+")[0]
+        lines, confidences = [], []
+        for image in images:
+            data = pytesseract.image_to_data(
+                self._downscale(image), lang=lang, config="--psm 6",
+                output_type=pytesseract.Output.DICT
+            )
+            current_line, words = None, []
+            for i, word in enumerate(data["text"]):
+                confidence = float(data["conf"][i])
+                if confidence < 0 or not word.strip():
+                    continue
+                line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+                if line != current_line and words:
+                    lines.append(" ".join(words))
+                    words = []
+                current_line = line
+                words.append(word)
+                confidences.append(confidence)
+            if words:
+                lines.append(" ".join(words))
+        
+        confidence = round(sum(confidences) / len(confidences), 1) if confidences else None
+        return "\n".join(lines), confidence
+    
+    def extract_text_from_image(self, image_path: Path) -> str:
+        """Extrait le texte d'une image."""
+        return self.extract_text_from_images(self.load_images(image_path))
     
     def extract_text_from_pdf(self, pdf_path: Path) -> str:
         """Extrait le texte d'un PDF."""
-        images = convert_from_path(pdf_path)
-        texts = []
-        for image in images:
-            text = pytesseract.image_to_string(image, lang=self.lang)
-            texts.append(text)
-        return "\n".join(texts)
+        return self.extract_text_from_images(self.load_images(pdf_path))
     
     def extract_text(self, file_path: Path) -> str:
         """Extrait le texte selon le type de fichier."""
-        suffix = file_path.suffix.lower()
-        if suffix == ".pdf":
-            return self.extract_text_from_pdf(file_path)
-        else:
-            return self.extract_text_from_image(file_path)
+        return self.extract_text_from_images(self.load_images(file_path))
     
     def _parse_float(self, value: str) -> Optional[float]:
         """Parse un nombre décimal (virgule ou point)."""
@@ -232,13 +313,88 @@ class OCRService:
         
         return tva_amount, tva_rate
     
+    def needs_escalation(self, data: ExtractedData) -> bool:
+        """True si le résultat justifie une passe OCR plus coûteuse."""
+        if data.amount_ttc is None:
+            return True
+        if data.vat_lines and not data.vat_validated:
+            return True
+        return data.confidence is not None and data.confidence < self.min_confidence
+    
+    def _quality(self, data: ExtractedData) -> tuple:
+        """Clé de comparaison entre résultats de niveaux différents."""
+        return (
+            not self.needs_escalation(data),
+            data.amount_ttc is not None,
+            data.vat_validated,
+            data.date is not None,
+            self.TIE_PREFERENCE[data.ocr_tier],
+        )
+    
+    def _run_tier(self, tier: str, images: List["Image.Image"]) -> ExtractedData:
+        start = time.perf_counter()
+        if tier == self.TIER_FAST:
+            raw_text, confidence = self.extract_text_fast(images)
+        elif tier == self.TIER_FULL:
+            raw_text, confidence = self.extract_text_from_images(images), None
+        else:
+            import pytesseract
+            raw_text = "\n".join(
+                pytesseract.image_to_string(image, lang=self.lang, config="--psm 4") for image in images
+            )
+            confidence = None
+        
+        data = self.parse_text(raw_text)
+        data.ocr_tier = tier
+        data.confidence = confidence
+        with self._stats_lock:
+            self._tier_stats[tier]["runs"] += 1
+            self._tier_stats[tier]["seconds"] += time.perf_counter() - start
+        return data
+    
     def extract_data(self, file_path: Path) -> ExtractedData:
         """
         Extrait toutes les données d'un document.
         Supporte les tickets multi-TVA.
+        
+        En mode par niveaux, s'arrête au premier niveau dont le résultat est
+        exploitable (TTC trouvé, TVA cohérente, confiance suffisante); sinon
+        retient le meilleur résultat obtenu.
         """
-        raw_text = self.extract_text(file_path)
+        images = self.load_images(file_path)
+        tiers = self.TIERS if self.tiered else [self.TIER_FULL]
         
+        candidates = []
+        for tier in tiers:
+            candidates.append(self._run_tier(tier, images))
+            if not self.needs_escalation(candidates[-1]):
+                break
+        # Si aucun niveau n'est exploitable, les égalités vont à la passe complète
+        data = max(candidates, key=self._quality)
+        data.image = images[0] if images else None
+        
+        with self._stats_lock:
+            self._documents += 1
+            self._tier_stats[data.ocr_tier]["used"] += 1
+        return data
+    
+    def stats(self) -> dict:
+        """Utilisation de chaque niveau d'OCR depuis le démarrage du processus."""
+        with self._stats_lock:
+            documents = self._documents
+            tiers = {
+                tier: {
+                    "used": s["used"],
+                    "used_pct": round(s["used"] / documents * 100, 1) if documents else 0.0,
+                    "runs": s["runs"],
+                    "avg_seconds": round(s["seconds"] / s["runs"], 3) if s["runs"] else 0.0,
+                }
+                for tier, s in self._tier_stats.items()
+            }
+        return {"documents": documents, "tiers": tiers}
+    
+    def parse_text(self, raw_text: str) -> ExtractedData:
+        """Extrait les données structurées d'un texte OCR."""
         # Parse les différents éléments
         date = self.parse_date(raw_text)
         amount_ttc = self.parse_amount(raw_text)
@@ -298,4 +454,9 @@ class OCRService:
 
 
 # Instance singleton
-ocr_service = OCRService()
+ocr_service = OCRService(
+    lang=settings.TESSERACT_LANG,
+    tiered=settings.OCR_TIERED,
+    fast_max_side=settings.OCR_FAST_MAX_SIDE,
+    min_confidence=settings.OCR_MIN_CONFIDENCE,
+)
@@ -0,0 +1,308 @@
+"""
+Service de stockage des justificatifs.
+Arborescence shardée par hash ({aa}/{bb}/{uuid}.{ext}), recompression optionnelle
+après OCR et drivers interchangeables (système de fichiers local, S3 compatible).
+"""
+from sqlalchemy import select, bindparam
+from sqlalchemy.orm import sessionmaker
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+import anyio
+import hashlib
+import mimetypes
+import re
+import shutil
+import tempfile
+
+from app.config import settings
+from app.models.database import AsyncSessionLocal, tenant_router
+from app.models.expense import Expense
+
+
+class StorageDriver(ABC):
+    """Interface d'un backend de stockage de fichiers adressés par clé."""
+
+    @abstractmethod
+    def put_file(self, src: Path, key: str, move: bool = True) -> None:
+        """Stocke un fichier local sous la clé donnée (déplacé si move=True)."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Supprime un fichier (sans erreur s'il n'existe pas)."""
+
+    @abstractmethod
+    def download(self, key: str, dest: Path) -> None:
+        """Copie un fichier vers un chemin local. Lève FileNotFoundError si absent."""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Chemin local direct si le driver en dispose (permet sendfile)."""
+        return None
+
+    def url(self, key: str, expires: int = 3600) -> Optional[str]:
+        """URL de téléchargement directe si le driver en propose une."""
+        return None
+
+
+class LocalStorageDriver(StorageDriver):
+    """Stockage sur le système de fichiers local."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+    def put_file(self, src: Path, key: str, move: bool = True) -> None:
+        dest = self.local_path(key)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            shutil.move(src, dest)
+        else:
+            shutil.copy2(src, dest)
+
+    def delete(self, key: str) -> None:
+        self.local_path(key).unlink(missing_ok=True)
+
+    def download(self, key: str, dest: Path) -> None:
+        shutil.copyfile(self.local_path(key), dest)
+
+
+class S3StorageDriver(StorageDriver):
+    """
+    Stockage objet compatible S3 (AWS, MinIO, ...).
+    Les identifiants sont lus depuis l'environnement standard (AWS_ACCESS_KEY_ID, ...).
+    """
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None):
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self._client = None
+
+    @property
+    def client(self):
+        """Client boto3 créé à la première utilisation (import coûteux)."""
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError("boto3 est requis pour STORAGE_DRIVER=s3 (pip install boto3)") from e
+            self._client = boto3.client("s3", endpoint_url=self.endpoint_url)
+        return self._client
+
+    def put_file(self, src: Path, key: str, move: bool = True) -> None:
+        # Type MIME stocké avec l'objet: servi tel quel via l'URL présignée
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        self.client.upload_file(str(src), self.bucket, key, ExtraArgs={"ContentType": content_type})
+        if move:
+            src.unlink(missing_ok=True)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def download(self, key: str, dest: Path) -> None:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.download_file(self.bucket, key, str(dest))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def url(self, key: str, expires: int = 3600) -> str:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key, "ResponseContentDisposition": "inline"},
+            ExpiresIn=expires,
+        )
+
+
+class StorageService:
+    """Gère le stockage des justificatifs au-dessus d'un driver."""
+
+    # Clé shardée: "3f/a2/<nom>"
+    _KEY_PATTERN = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[^/]+$')
+    # Formats recompressés en WebP (les PDF et WebP sont conservés tels quels)
+    _RECOMPRESSIBLE = {".jpg", ".jpeg", ".png"}
+
+    def __init__(self, driver: StorageDriver, staging_dir: Path,
+                 recompress: str = "none", quality: int = 90):
+        if recompress not in ("none", "lossless", "visual"):
+            raise ValueError(f"Mode de recompression inconnu: {recompress}")
+        self.driver = driver
+        self.staging_dir = staging_dir
+        self.recompress_mode = recompress
+        self.quality = quality
+
+    def warm_up(self) -> None:
+        """Crée la zone de transit et précharge les dépendances du driver."""
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        if isinstance(self.driver, S3StorageDriver):
+            self.driver.client
+        if self.recompress_mode != "none":
+            from PIL import Image  # noqa: F401
+
+    def staging_path(self, filename: str) -> Path:
+        """Chemin en zone de transit pour un fichier en cours de traitement."""
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        return self.staging_dir / filename
+
+    @staticmethod
+    def make_key(filename: str) -> str:
+        """Construit la clé shardée d'un fichier à partir du hash de son nom."""
+        digest = hashlib.sha1(Path(filename).stem.encode()).hexdigest()
+        return f"{digest[:2]}/{digest[2:4]}/{filename}"
+
+    def is_key(self, value: str) -> bool:
+        """False pour les anciens chemins à plat (uploads/{uuid}.{ext})."""
+        return bool(self._KEY_PATTERN.match(value))
+
+    def recompress(self, path: Path) -> Path:
+        """
+        Recompresse une image en WebP si le résultat est plus petit.
+
+        - "lossless": PNG -> WebP sans perte (les JPEG, déjà avec perte, sont conservés)
+        - "visual": JPEG/PNG -> WebP haute qualité (visuellement sans perte)
+
+        Returns:
+            Le nouveau fichier (l'original n'est pas supprimé), ou `path` inchangé.
+        """
+        suffix = path.suffix.lower()
+        if self.recompress_mode == "none" or suffix not in self._RECOMPRESSIBLE:
+            return path
+        if self.recompress_mode == "lossless" and suffix != ".png":
+            return path
+
+        from PIL import Image, ImageOps
+
+        target = path.with_suffix(".webp")
+        with Image.open(path) as image:
+            image = ImageOps.exif_transpose(image)
+            if self.recompress_mode == "lossless":
+                image.save(target, "WEBP", lossless=True, method=6)
+            else:
+                image.save(target, "WEBP", quality=self.quality, method=6)
+
+        if target.stat().st_size >= path.stat().st_size:
+            target.unlink()
+            return path
+        return target
+
+    def store(self, path: Path, keep_source: bool = False) -> str:
+        """Recompresse (selon la configuration) puis stocke un fichier. Retourne sa clé."""
+        path = Path(path)
+        stored = self.recompress(path)
+        key = self.make_key(stored.name)
+        if stored != path:
+            self.driver.put_file(stored, key, move=True)
+            if not keep_source:
+                path.unlink(missing_ok=True)
+        else:
+            self.driver.put_file(path, key, move=not keep_source)
+        return key
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Chemin local d'un fichier (y compris les anciens chemins non migrés)."""
+        if not self.is_key(key):
+            return Path(key)
+        return self.driver.local_path(key)
+
+    def url(self, key: str, expires: int = 3600) -> Optional[str]:
+        return self.driver.url(key, expires)
+
+    def delete(self, key: str) -> None:
+        if not self.is_key(key):
+            Path(key).unlink(missing_ok=True)
+        else:
+            self.driver.delete(key)
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[Path]:
+        """Fournit un chemin local vers le fichier (téléchargé si nécessaire)."""
+        path = self.local_path(key)
+        if path is not None:
+            if not path.is_file():
+                raise FileNotFoundError(key)
+            yield path
+            return
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = Path(tmp) / Path(key).name
+            self.driver.download(key, dest)
+            yield dest
+
+    async def migrate_file_paths(self, batch_size: int = 500,
+                                 session_factory: sessionmaker = AsyncSessionLocal) -> int:
+        """
+        Migre les anciens chemins à plat vers le stockage shardé.
+
+        Parcourt la table par lots (pagination par id), copie les fichiers, met à
+        jour file_path en une seule requête par lot, puis supprime les originaux
+        une fois le lot validé. Peut être relancé sans risque après interruption.
+
+        Returns:
+            Nombre de fichiers migrés.
+        """
+        table = Expense.__table__
+        stmt = table.update().where(table.c.id == bindparam("_id")).values(file_path=bindparam("_key"))
+        migrated = 0
+        last_id = 0
+        while True:
+            async with session_factory() as db:
+                result = await db.execute(
+                    select(Expense.id, Expense.file_path)
+                    .where(Expense.id > last_id, Expense.file_path.isnot(None))
+                    .order_by(Expense.id)
+                    .limit(batch_size)
+                )
+                rows = result.all()
+                if not rows:
+                    return migrated
+                last_id = rows[-1].id
+
+                updates, sources = [], []
+                for row in rows:
+                    legacy = Path(row.file_path)
+                    if self.is_key(row.file_path) or not legacy.is_file():
+                        continue
+                    key = await anyio.to_thread.run_sync(self.store, legacy, True)
+                    updates.append({"_id": row.id, "_key": key})
+                    sources.append(legacy)
+
+                if updates:
+                    await db.execute(stmt, updates)
+                    await db.commit()
+                    for legacy in sources:
+                        legacy.unlink(missing_ok=True)
+                    migrated += len(updates)
+
+
+def _create_driver() -> StorageDriver:
+    if settings.STORAGE_DRIVER == "s3":
+        return S3StorageDriver(settings.S3_BUCKET, settings.S3_ENDPOINT_URL)
+    return LocalStorageDriver(settings.UPLOAD_DIR)
+
+
+# Instance singleton
+storage_service = StorageService(
+    _create_driver(),
+    staging_dir=settings.UPLOAD_DIR / "incoming",
+    recompress=settings.STORAGE_RECOMPRESS,
+    quality=settings.STORAGE_RECOMPRESS_QUALITY,
+)
+
+
+async def _migrate_all_databases() -> int:
+    """Migre la base principale puis chaque shard de tenant."""
+    count = await storage_service.migrate_file_paths()
+    if tenant_router is not None:
+        for tenant_id in await tenant_router.known_tenants():
+            factory = await tenant_router.session_factory(tenant_id)
+            count += await storage_service.migrate_file_paths(session_factory=factory)
+    return count
+
+
+if __name__ == "__main__":
+    # python -m app.services.storage_service
+    count = anyio.run(_migrate_all_databases)
+    print(f"{count} fichier(s) migré(s)")
@@ -0,0 +1,92 @@
+"""
+Service de génération des miniatures de justificatifs.
+Les miniatures (WebP, première page pour les PDF) sont générées une seule fois
+puis mises en cache sur disque.
+"""
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+import os
+import tempfile
+
+from app.config import settings
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class ThumbnailService:
+    """Génère et met en cache les miniatures WebP des justificatifs."""
+
+    def __init__(self, cache_dir: Path = settings.THUMBNAIL_DIR,
+                 size: int = settings.THUMBNAIL_SIZE,
+                 quality: int = settings.THUMBNAIL_QUALITY):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.quality = quality
+
+    def warm_up(self) -> None:
+        """Précharge Pillow/pdf2image et crée le répertoire de cache."""
+        import pdf2image  # noqa: F401
+        from PIL import Image  # noqa: F401
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def thumbnail_path(self, file_path: Path) -> Path:
+        """Chemin de la miniature en cache pour un justificatif."""
+        return self.cache_dir / f"{Path(file_path).stem}.webp"
+
+    def _load_first_page(self, file_path: Path) -> "Image.Image":
+        """Décode uniquement ce qui est nécessaire à la miniature."""
+        from PIL import Image, ImageOps
+        from pdf2image import convert_from_path
+
+        if file_path.suffix.lower() == ".pdf":
+            # Rendu basse résolution de la première page seulement
+            return convert_from_path(file_path, dpi=72, first_page=1, last_page=1)[0]
+        image = Image.open(file_path)
+        # JPEG: décodage directement à une échelle réduite (DCT scaling)
+        image.draft("RGB", (self.size, self.size))
+        return ImageOps.exif_transpose(image)
+
+    def generate(self, file_path: Path, image: Optional["Image.Image"] = None) -> Path:
+        """
+        Génère la miniature si elle n'existe pas encore.
+
+        Args:
+            file_path: Justificatif original.
+            image: Image déjà décodée (ex: par l'OCR) pour éviter un second décodage.
+        """
+        file_path = Path(file_path)
+        target = self.thumbnail_path(file_path)
+        if target.exists():
+            return target
+
+        from PIL import Image
+
+        if image is None:
+            image = self._load_first_page(file_path)
+
+        # Copie pour ne pas modifier l'image partagée avec l'OCR
+        thumb = image.convert("RGB") if image.mode not in ("L", "RGB") else image.copy()
+        thumb.thumbnail((self.size, self.size), Image.Resampling.LANCZOS)
+
+        # Écriture atomique: fichier temporaire propre à cet appel (l'upload et un
+        # /thumbnail concurrent tournent dans le même processus), puis renommage
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=f"{target.name}.",
+                                         suffix=".tmp", delete=False) as tmp:
+            try:
+                thumb.save(tmp, "WEBP", quality=self.quality, method=4)
+            except BaseException:
+                tmp.close()
+                os.unlink(tmp.name)
+                raise
+        os.replace(tmp.name, target)
+        return target
+
+    def delete(self, file_path: Path) -> None:
+        """Supprime la miniature en cache."""
+        self.thumbnail_path(file_path).unlink(missing_ok=True)
+
+
+# Instance singleton
+thumbnail_service = ThumbnailService()
@@ -0,0 +1,104 @@
+"""
+Benchmark de l'endpoint d'analyse sur un grand volume de dépenses.
+
+Usage (depuis backend/):
+    python benchmarks/analytics.py [--rows 1000000] [--skip-orm]
+
+Mesure, sur une base SQLite temporaire:
+- le chargement colonnaire (une requête -> tableaux NumPy);
+- les calculs vectorisés (totaux, moyennes mobiles, évolution sur un an, atypiques);
+- un appel servi depuis le cache (tendances déjà calculées);
+- à titre de comparaison, des totaux mensuels par catégorie calculés en itérant
+  des objets Expense en Python (comme generate_excel pour les totaux).
+"""
+from pathlib import Path
+from collections import defaultdict
+from datetime import date, timedelta
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models import Base, Expense
+from app.schemas import ExpenseCategory
+from app.services.analytics_service import AnalyticsService, compute_trends
+
+
+async def seed(db: AsyncSession, rows: int, batch_size: int = 50_000) -> None:
+    rng = random.Random(42)
+    categories = [c.value for c in ExpenseCategory]
+    start = date(2015, 1, 1)
+    for offset in range(0, rows, batch_size):
+        batch = [
+            {
+                "date": start + timedelta(days=rng.randrange(365 * 10)),
+                "amount_ttc": round(rng.lognormvariate(3, 1), 2),
+                "category": rng.choice(categories),
+            }
+            for _ in range(min(batch_size, rows - offset))
+        ]
+        await db.execute(insert(Expense), batch)
+    await db.commit()
+
+
+async def orm_monthly_totals(db: AsyncSession) -> dict:
+    totals = defaultdict(float)
+    for expense in (await db.execute(select(Expense))).scalars():
+        totals[(expense.category, expense.date.year, expense.date.month)] += expense.amount_ttc or 0
+    return totals
+
+
+async def run(rows: int, skip_orm: bool) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            await seed(db, rows)
+            service = AnalyticsService()
+
+            start = time.perf_counter()
+            columns = await service.get_columns(db)
+            load = time.perf_counter() - start
+
+            start = time.perf_counter()
+            compute_trends(columns)
+            compute = time.perf_counter() - start
+
+            await service.trends(db)  # Calcul et mise en cache des tendances
+            start = time.perf_counter()
+            await service.trends(db)
+            cached = time.perf_counter() - start
+
+            print(f"{rows} lignes")
+            print(f"Chargement colonnaire   {load * 1000:>10.0f} ms")
+            print(f"Calculs vectorisés      {compute * 1000:>10.0f} ms")
+            print(f"Appel depuis le cache   {cached * 1000:>10.0f} ms")
+
+            if not skip_orm:
+                db.expunge_all()
+                start = time.perf_counter()
+                await orm_monthly_totals(db)
+                print(f"ORM + boucle Python     {(time.perf_counter() - start) * 1000:>10.0f} ms"
+                      " (totaux mensuels seulement)")
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-orm", action="store_true", help="Ne pas mesurer le chemin ORM (lent)")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.skip_orm))
+
+
+if __name__ == "__main__":
+    main()
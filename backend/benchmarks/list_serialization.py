@@ -0,0 +1,109 @@
+"""
+Benchmark de la sérialisation de la liste des dépenses.
+
+Usage (depuis backend/):
+    python benchmarks/list_serialization.py [--rows 10000] [--repeat 5]
+
+Compare, sur une base SQLite en mémoire:
+- ORM: select(Expense) -> validation ExpenseResponse (from_attributes) -> json
+  stdlib, c'est-à-dire l'ancien chemin FastAPI de list_expenses;
+- rapide: select(colonnes) -> dicts -> orjson (chemin actuel).
+"""
+from pathlib import Path
+from datetime import date, timedelta
+from typing import List
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import Base, Expense
+from app.routers.expenses import _RESPONSE_COLUMNS, _rows_to_dicts
+from app.schemas import ExpenseResponse, ExpenseCategory
+
+adapter = TypeAdapter(List[ExpenseResponse])
+
+
+def seed(session: Session, rows: int) -> None:
+    rng = random.Random(42)
+    categories = [c.value for c in ExpenseCategory]
+    start = date(2020, 1, 1)
+    data = []
+    for i in range(rows):
+        ttc = round(rng.uniform(2, 500), 2)
+        data.append({
+            "date": start + timedelta(days=rng.randrange(365 * 5)),
+            "description": f"Dépense {i}",
+            "amount_ht": round(ttc / 1.2, 2),
+            "tva": round(ttc - ttc / 1.2, 2),
+            "amount_ttc": ttc,
+            "tva_rate": 20.0,
+            "category": rng.choice(categories),
+            "vendor": f"Fournisseur {i % 200}",
+            "file_path": f"ab/cd/{i:08d}.jpg",
+            "ocr_raw": "TOTAL " * 40,
+        })
+    session.execute(insert(Expense), data)
+    session.commit()
+
+
+def orm_path(session: Session) -> bytes:
+    expenses = session.execute(select(Expense).order_by(Expense.date.desc())).scalars().all()
+    content = adapter.dump_python(adapter.validate_python(expenses, from_attributes=True), mode="json")
+    # Même encodage que starlette.responses.JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(session: Session) -> bytes:
+    result = session.execute(select(*_RESPONSE_COLUMNS).order_by(Expense.date.desc()))
+    return orjson.dumps(_rows_to_dicts(result))
+
+
+def measure(fn, session: Session, repeat: int) -> dict:
+    cpu_times, peaks = [], []
+    for _ in range(repeat):
+        session.expunge_all()
+        tracemalloc.start()
+        start = time.process_time()
+        fn(session)
+        cpu_times.append(time.process_time() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "cpu_ms": statistics.median(cpu_times) * 1000,
+        "peak_mb": statistics.median(peaks) / 1024 / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, args.rows)
+        # Les deux chemins doivent produire le même JSON
+        assert json.loads(orm_path(session)) == json.loads(fast_path(session))
+
+        print(f"{args.rows} lignes, médiane sur {args.repeat} exécutions (CPU mesuré avec tracemalloc actif)")
+        print(f"{'Chemin':<10}{'CPU (ms)':>12}{'Pic mémoire (Mo)':>20}")
+        for name, fn in (("ORM", orm_path), ("Rapide", fast_path)):
+            result = measure(fn, session, args.repeat)
+            print(f"{name:<10}{result['cpu_ms']:>12.1f}{result['peak_mb']:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
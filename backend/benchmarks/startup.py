@@ -0,0 +1,64 @@
+"""
+Mesure du temps de démarrage et de la mémoire (RSS max) d'un worker.
+
+Usage (depuis backend/):
+    python benchmarks/startup.py [--runs 5]
+
+Compare un worker API seul (services chargés à la demande) avec un worker qui
+précharge toutes les dépendances, ce qui correspond à l'ancien import eager de
+app.services (pytesseract, Pillow, pdf2image, openpyxl, weasyprint).
+"""
+from pathlib import Path
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    "API seule (lazy)": "import app.main",
+    # Mêmes dépendances que l'ancien import eager (NumPy et boto3 n'en faisaient pas partie)
+    "Préchargé (eager)": 'import app.main; from app.services import preload; preload("ocr", "export", "thumbnail")',
+}
+
+PROBE = """
+import json, resource, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": len(__import__("sys").modules),
+}}))
+"""
+
+
+def measure(code: str, runs: int) -> dict:
+    """Lance `runs` interpréteurs neufs et retourne les médianes."""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(code=code)],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'Scénario':<26}{'Import (ms)':>14}{'RSS max (Mo)':>15}{'Modules':>10}")
+    for name, code in SCENARIOS.items():
+        result = measure(code, args.runs)
+        print(f"{name:<26}{result['seconds'] * 1000:>14.0f}"
+              f"{result['maxrss_kb'] / 1024:>15.1f}{result['modules']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
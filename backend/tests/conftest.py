@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.models import Base, get_db
+from app.services import analytics_service, storage_service, thumbnail_service
+from app.services.storage_service import LocalStorageDriver
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    """Session sur une base SQLite en mémoire, tables créées."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Base SQLite temporaire (tables créées); sessions synchrones pour préparer les données."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(engine, expire_on_commit=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(database, tmp_path, monkeypatch):
+    """Client HTTP de l'application sur la base `database` et un stockage local temporaire."""
+    url = database.kw["bind"].url.set(drivername="sqlite+aiosqlite")
+    # NullPool: TestClient peut changer de boucle d'événements entre deux requêtes
+    engine = create_async_engine(url, poolclass=NullPool)
+    factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(storage_service, "driver", LocalStorageDriver(tmp_path / "store"))
+    monkeypatch.setattr(storage_service, "staging_dir", tmp_path / "incoming")
+    monkeypatch.setattr(thumbnail_service, "cache_dir", tmp_path / "thumbnails")
+    analytics_service._cache.clear()
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
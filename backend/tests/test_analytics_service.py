@@ -0,0 +1,114 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.services.analytics_service import ExpenseColumns, compute_trends
+
+
+def make_columns(rows):
+    """rows: (id, (année, mois), catégorie, montant TTC en euros)."""
+    names = list(dict.fromkeys(category for _, _, category, _ in rows))
+    return ExpenseColumns(
+        ids=np.array([row[0] for row in rows], dtype=np.int64),
+        months=np.array([year * 12 + month - 1 for _, (year, month), _, _ in rows], dtype=np.int32),
+        categories=np.array([names.index(row[2]) for row in rows], dtype=np.int32),
+        cents=np.array([round(row[3] * 100) for row in rows], dtype=np.int64),
+        category_names=names,
+        loaded_at=time.monotonic(),
+    )
+
+
+def test_empty():
+    trends = compute_trends(make_columns([]))
+    assert trends["months"] == [] and trends["total"] is None and trends["outliers"] == []
+
+
+def test_monthly_totals_and_moving_average():
+    columns = make_columns([
+        (1, (2023, 11), "repas", 10.0),
+        (2, (2023, 11), "repas", 5.5),
+        (3, (2023, 12), "transport", 20.0),
+        # Pas de dépense en janvier: mois à zéro
+        (4, (2024, 2), "repas", 30.0),
+    ])
+    trends = compute_trends(columns, window=2)
+
+    assert trends["months"] == ["2023-11", "2023-12", "2024-01", "2024-02"]
+    by_category = {c["category"]: c for c in trends["categories"]}
+    assert by_category["repas"]["totals"] == [15.5, 0.0, 0.0, 30.0]
+    assert by_category["transport"]["totals"] == [0.0, 20.0, 0.0, 0.0]
+    assert trends["total"]["totals"] == [15.5, 20.0, 0.0, 30.0]
+    moving = trends["total"]["moving_average"]
+    assert np.isnan(moving[0])
+    assert moving[1:] == [17.75, 10.0, 15.0]
+
+
+def test_year_over_year():
+    rows = [(i, (2023 + (i - 1) // 12, (i - 1) % 12 + 1), "repas", 100.0) for i in range(1, 13)]
+    rows.append((13, (2024, 1), "repas", 150.0))
+    trends = compute_trends(make_columns(rows))
+    total = trends["total"]
+    assert all(np.isnan(value) for value in total["yoy_delta"][:12])
+    assert total["yoy_delta"][12] == 50.0
+    assert total["yoy_pct"][12] == 50.0
+
+
+def test_outliers():
+    rows = [(i, (2024, 1), "repas", 10.0 + (i % 3)) for i in range(1, 31)]
+    rows.append((99, (2024, 1), "repas", 480.0))
+    rows += [(100 + i, (2024, 1), "hotel", 120.0 + i) for i in range(5)]
+    trends = compute_trends(make_columns(rows), outlier_threshold=3.5)
+    assert [o["id"] for o in trends["outliers"]] == [99]
+    outlier = trends["outliers"][0]
+    assert outlier["category"] == "repas"
+    assert outlier["month"] == "2024-01"
+    assert outlier["amount_ttc"] == 480.0
+
+    assert compute_trends(make_columns(rows), outlier_limit=0)["outliers"] == []
+
+
+@pytest.mark.anyio
+async def test_trends_cached_and_invalidated(db):
+    from datetime import date
+    from app.models import Expense
+    from app.services.analytics_service import AnalyticsService
+
+    service = AnalyticsService()
+    db.add(Expense(date=date(2024, 1, 5), amount_ttc=12.0, category="repas"))
+    await db.commit()
+
+    first = await service.trends(db)
+    assert await service.trends(db) is first
+    assert await service.trends(db, window=6) is not first
+
+    service.invalidate(db.info.get("tenant_id"))
+    assert await service.trends(db) is not first
+
+
+@pytest.mark.anyio
+async def test_only_expense_writes_invalidate(db):
+    from datetime import date
+    from sqlalchemy import insert, update
+    from app.models import BankTransaction, Expense
+    from app.services.analytics_service import analytics_service
+
+    db.add(Expense(date=date(2024, 1, 5), amount_ttc=12.0, category="repas"))
+    await db.commit()
+    first = await analytics_service.trends(db)
+
+    # Import de relevé: écritures sur bank_transactions uniquement
+    await db.execute(insert(BankTransaction), [{"import_id": "x", "date": date(2024, 1, 5), "amount": -12.0}])
+    await db.execute(update(BankTransaction).values(expense_id=None))
+    await db.commit()
+    assert await analytics_service.trends(db) is first
+
+    await db.execute(update(Expense).values(category="transport"))
+    await db.commit()
+    second = await analytics_service.trends(db)
+    assert second is not first
+    assert [c["category"] for c in second["categories"]] == ["transport"]
+
+    await db.execute(Expense.__table__.delete())
+    await db.commit()
+    assert (await analytics_service.trends(db))["months"] == []
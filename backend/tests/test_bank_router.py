@@ -0,0 +1,47 @@
+from datetime import date
+
+from sqlalchemy import select
+
+from app.models import BankTransaction, Expense
+
+STATEMENT = "Date;Libellé;Montant\n05/03/2024;CB CARREFOUR;-45,20\n"
+
+
+def import_statement(client, data=STATEMENT):
+    response = client.post("/api/bank/import", files={"file": ("releve.csv", data.encode())})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_deleted_expense_releases_its_bank_link(client, database):
+    with database() as session:
+        session.add(Expense(id=1, date=date(2024, 3, 5), amount_ttc=45.20, vendor="Carrefour"))
+        session.commit()
+    assert import_statement(client)["matched"] == 1
+
+    assert client.delete("/api/expenses/1").status_code == 200
+    with database() as session:
+        assert session.scalars(select(BankTransaction.expense_id)).all() == [None]
+        # SQLite réutilise le plus grand rowid après suppression
+        session.add(Expense(id=1, date=date(2024, 3, 10), amount_ttc=12.0, vendor="SNCF"))
+        session.commit()
+
+    report = import_statement(client, "Date;Libellé;Montant\n10/03/2024;CB SNCF;-12,00\n")
+    assert report["matched"] == 1
+    assert report["matches"][0]["expense_id"] == 1
+
+
+def test_batch_delete_releases_bank_links(client, database):
+    with database() as session:
+        session.add_all([
+            Expense(id=1, date=date(2024, 3, 5), amount_ttc=45.20, vendor="Carrefour", category="repas"),
+            Expense(id=2, date=date(2024, 3, 6), amount_ttc=9.90, vendor="Netflix", category="abonnement"),
+        ])
+        session.commit()
+    import_statement(client, STATEMENT + "06/03/2024;NETFLIX;-9,90\n")
+
+    response = client.request("DELETE", "/api/expenses/batch", json={"filter": {"category": "repas"}})
+    assert response.json() == {"count": 1}
+    with database() as session:
+        links = session.scalars(select(BankTransaction.expense_id).order_by(BankTransaction.id)).all()
+    assert links == [None, 2]
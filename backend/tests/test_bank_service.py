@@ -0,0 +1,218 @@
+from datetime import date
+import csv
+import io
+
+import pytest
+from sqlalchemy import select
+
+from app.models import BankTransaction, Expense
+from app.services.bank_service import BankService, normalize_label, parse_amount, parse_date
+
+
+@pytest.fixture
+def service():
+    return BankService(batch_size=2)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("-1 234,56", -1234.56),
+    ("1.234,56", 1234.56),
+    ("1,234.56", 1234.56),
+    ("-12.50 €", -12.5),
+    ("12,50 EUR", 12.5),
+    ("+3", 3.0),
+    (" -7,10", -7.1),
+    ("", None),
+    (None, None),
+    ("€", None),
+    ("n/a", None),
+])
+def test_parse_amount(value, expected):
+    assert parse_amount(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("05/03/2024", date(2024, 3, 5)),
+    ("05/03/24", date(2024, 3, 5)),
+    ("2024-03-05", date(2024, 3, 5)),
+    ("05-03-2024", date(2024, 3, 5)),
+    (" 05.03.2024 ", date(2024, 3, 5)),
+    ("31/02/2024", None),
+    ("Solde", None),
+    (None, None),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+def test_normalize_label():
+    assert normalize_label("CB CARREFOUR 12/03 Paris-15") == "CARREFOUR PARIS"
+    assert normalize_label("PRLV SEPA Électricité de France") == "ELECTRICITE FRANCE"
+    assert normalize_label(None) == ""
+
+
+def test_parse_csv_french_export(service):
+    # En-têtes de compte avant la ligne de colonnes, séparateur ";"
+    data = (
+        "Compte courant;FR76 1234\n"
+        "Solde au 31/03/2024;1 000,00\n"
+        "\n"
+        "Date opération;Libellé;Montant (€)\n"
+        "05/03/2024;CB CARREFOUR;-45,20\n"
+        "06/03/2024;VIR SALAIRE;2 500,00\n"
+        "Total;;2 454,80\n"
+    )
+    transactions = list(service.parse_csv(io.StringIO(data)))
+    assert [(t.date, t.amount, t.label) for t in transactions] == [
+        (date(2024, 3, 5), -45.2, "CB CARREFOUR"),
+        (date(2024, 3, 6), 2500.0, "VIR SALAIRE"),
+    ]
+
+
+def test_parse_csv_debit_credit_columns(service):
+    data = (
+        "Date,Description,Debit,Credit\n"
+        "2024-03-05,Restaurant,12.50,\n"
+        "2024-03-06,Remboursement,,30.00\n"
+        "2024-03-07,Vide,,\n"
+    )
+    transactions = list(service.parse_csv(io.StringIO(data)))
+    assert [(t.date, t.amount) for t in transactions] == [
+        (date(2024, 3, 5), -12.5),
+        (date(2024, 3, 6), 30.0),
+    ]
+
+
+def test_parse_csv_unknown_headers(service):
+    with pytest.raises(ValueError):
+        list(service.parse_csv(io.StringIO("a;b;c\n1;2;3\n")))
+
+
+def test_parse_csv_field_too_large(service):
+    data = "Date;Montant\n\"05/03/2024;" + "x" * (csv.field_size_limit() + 1) + "\n"
+    with pytest.raises(csv.Error):
+        list(service.parse_csv(io.StringIO(data)))
+
+
+def test_parse_ofx_sgml(service):
+    # OFX 1.x: balises feuilles sans fermeture
+    data = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<DTSTART>20240301
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240305120000[+1:CET]
+<TRNAMT>-45.20
+<FITID>ABC1
+<NAME>CB CARREFOUR
+<MEMO>PARIS
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20240306
+<TRNAMT>2500,00
+<FITID>ABC2
+<NAME>SALAIRE
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+    transactions = list(service.parse_ofx(io.StringIO(data)))
+    assert [(t.date, t.amount, t.label, t.reference) for t in transactions] == [
+        (date(2024, 3, 5), -45.2, "CB CARREFOUR PARIS", "ABC1"),
+        (date(2024, 3, 6), 2500.0, "SALAIRE", "ABC2"),
+    ]
+
+
+def test_parse_ofx_xml_single_line(service):
+    data = (
+        '<?xml version="1.0"?><OFX><BANKTRANLIST>'
+        "<STMTTRN><DTPOSTED>20240305</DTPOSTED><TRNAMT>-9.99</TRNAMT><FITID>X1</FITID>"
+        "<NAME>NETFLIX</NAME></STMTTRN>"
+        "<STMTTRN><DTPOSTED>invalide</DTPOSTED><TRNAMT>-1.00</TRNAMT></STMTTRN>"
+        "</BANKTRANLIST></OFX>"
+    )
+    transactions = list(service.parse_ofx(io.StringIO(data)))
+    assert [(t.date, t.amount, t.label, t.reference) for t in transactions] == [
+        (date(2024, 3, 5), -9.99, "NETFLIX", "X1"),
+    ]
+
+
+def test_vendor_similarity(service):
+    assert service.vendor_similarity("CARREFOUR", "CARREFOUR MARKET PARIS") == 1.0
+    assert service.vendor_similarity("CARREFOUR", "SNCF") < service.min_similarity
+    assert service.vendor_similarity("", "SNCF") == 0.0
+
+
+STATEMENT = (
+    "Date;Libellé;Montant\n"
+    "05/03/2024;CB CARREFOUR MARKET;-45,20\n"
+    "05/03/2024;CB CAFE;-3,50\n"
+    "05/03/2024;CB CAFE;-3,50\n"
+    "07/03/2024;CB SNCF;-89,00\n"
+    "08/03/2024;VIR CLIENT;1 200,00\n"
+).encode()
+
+
+@pytest.mark.anyio
+async def test_import_skips_already_imported_lines(db, service):
+    _, imported, skipped = await service.import_statement(db, io.BytesIO(STATEMENT), "releve.csv")
+    assert (imported, skipped) == (5, 0)
+
+    # Réimport: rien n'est inséré deux fois
+    _, imported, skipped = await service.import_statement(db, io.BytesIO(STATEMENT), "releve.csv")
+    assert (imported, skipped) == (0, 5)
+
+    # Relevé qui chevauche: seule la ligne nouvelle est insérée (3e café compris)
+    overlapping = STATEMENT + "05/03/2024;CB CAFE;-3,50\n".encode()
+    _, imported, skipped = await service.import_statement(db, io.BytesIO(overlapping), "releve.csv")
+    assert (imported, skipped) == (1, 5)
+
+    count = len((await db.execute(select(BankTransaction.id))).all())
+    assert count == 6
+
+
+@pytest.mark.anyio
+async def test_import_dedupes_on_fitid(db, service):
+    ofx = (
+        "<OFX><BANKTRANLIST>"
+        "<STMTTRN><DTPOSTED>20240305<TRNAMT>-10.00<FITID>F1<NAME>A</STMTTRN>"
+        "<STMTTRN><DTPOSTED>20240305<TRNAMT>-10.00<FITID>F2<NAME>A</STMTTRN>"
+        "</BANKTRANLIST></OFX>"
+    ).encode()
+    assert (await service.import_statement(db, io.BytesIO(ofx), "r.ofx"))[1:] == (2, 0)
+    assert (await service.import_statement(db, io.BytesIO(ofx), "r.ofx"))[1:] == (0, 2)
+
+
+@pytest.mark.anyio
+async def test_reconcile(db, service):
+    db.add_all([
+        Expense(id=1, date=date(2024, 3, 4), amount_ttc=45.20, vendor="Carrefour"),
+        # Même montant et même date mais fournisseur différent: écarté
+        Expense(id=2, date=date(2024, 3, 5), amount_ttc=45.20, vendor="Leroy Merlin"),
+        # Sans fournisseur: montant et date suffisent
+        Expense(id=3, date=date(2024, 3, 5), amount_ttc=3.50),
+        # Hors de la fenêtre de dates
+        Expense(id=4, date=date(2024, 3, 20), amount_ttc=89.00, vendor="SNCF"),
+    ])
+    await db.flush()
+
+    import_id, _, _ = await service.import_statement(db, io.BytesIO(STATEMENT), "releve.csv")
+    report = await service.reconcile(db, import_id, date_window=3)
+
+    matched = {m["expense_id"] for m in report["matches"]}
+    assert matched == {1, 3}
+    assert report["debits"] == 4  # le virement reçu n'est pas un débit
+    assert report["unmatched_transactions_count"] == 2  # 2e café, SNCF
+    assert {e["id"] for e in report["unmatched_expenses"]} == {2}
+
+    links = dict((await db.execute(
+        select(BankTransaction.expense_id, BankTransaction.label).where(BankTransaction.expense_id.isnot(None))
+    )).all())
+    assert links == {1: "CB CARREFOUR MARKET", 3: "CB CAFE"}
+
+    # Les dépenses déjà rapprochées ne sont pas proposées à un import suivant
+    again = (
+        "Date;Libellé;Montant\n"
+        "06/03/2024;CB CARREFOUR;-45,20\n"
+    ).encode()
+    import_id, _, _ = await service.import_statement(db, io.BytesIO(again), "releve2.csv")
+    report = await service.reconcile(db, import_id, date_window=3)
+    assert report["matched"] == 0
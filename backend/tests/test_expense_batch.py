@@ -0,0 +1,77 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Expense
+from app.services import storage_service, thumbnail_service
+
+
+@pytest.fixture
+def expenses(client, database, tmp_path):
+    """Trois dépenses (deux en mars, dont une avec justificatif et miniature)."""
+    source = tmp_path / "receipt.png"
+    source.write_bytes(b"png")
+    file_key = storage_service.store(source)
+    thumbnail_service.thumbnail_path(file_key).parent.mkdir(parents=True, exist_ok=True)
+    thumbnail_service.thumbnail_path(file_key).write_bytes(b"webp")
+    with database() as session:
+        session.add_all([
+            Expense(id=1, date=date(2024, 3, 5), amount_ttc=10.0, category="repas", file_path=file_key),
+            Expense(id=2, date=date(2024, 3, 20), amount_ttc=20.0, category="transport"),
+            Expense(id=3, date=date(2024, 4, 2), amount_ttc=30.0, category="repas"),
+        ])
+        session.commit()
+    return file_key
+
+
+def categories(database):
+    with database() as session:
+        return dict(session.execute(select(Expense.id, Expense.category)).all())
+
+
+def test_batch_update_by_ids(client, database, expenses):
+    response = client.patch("/api/expenses/batch", json={"ids": [1, 3], "changes": {"category": "hebergement"}})
+    assert response.json() == {"count": 2}
+    assert categories(database) == {1: "hebergement", 2: "transport", 3: "hebergement"}
+
+
+def test_batch_update_by_filter(client, database, expenses):
+    response = client.patch("/api/expenses/batch", json={
+        "filter": {"month": 3, "year": 2024}, "changes": {"category": "autre"}
+    })
+    assert response.json() == {"count": 2}
+    assert categories(database) == {1: "autre", 2: "autre", 3: "repas"}
+
+
+def test_batch_update_without_changes(client, expenses):
+    response = client.patch("/api/expenses/batch", json={"ids": [1], "changes": {}})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("selection", [
+    {"ids": [1], "filter": {"month": 3}},
+    {},
+    {"filter": {}},
+])
+def test_batch_invalid_selection(client, expenses, selection):
+    response = client.patch("/api/expenses/batch", json={**selection, "changes": {"category": "autre"}})
+    assert response.status_code == 422
+    response = client.request("DELETE", "/api/expenses/batch", json=selection)
+    assert response.status_code == 422
+
+
+def test_batch_delete_by_ids_removes_files(client, database, expenses):
+    file_key = expenses
+    response = client.request("DELETE", "/api/expenses/batch", json={"ids": [1, 2, 99]})
+    assert response.json() == {"count": 2}
+    assert categories(database) == {3: "repas"}
+    # Tâche de fond exécutée avant la fin de la réponse par TestClient
+    assert not storage_service.local_path(file_key).exists()
+    assert not thumbnail_service.thumbnail_path(file_key).exists()
+
+
+def test_batch_delete_by_filter(client, database, expenses):
+    response = client.request("DELETE", "/api/expenses/batch", json={"filter": {"category": "repas"}})
+    assert response.json() == {"count": 2}
+    assert categories(database) == {2: "transport"}
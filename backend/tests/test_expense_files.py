@@ -0,0 +1,64 @@
+from datetime import date
+
+import pytest
+from PIL import Image
+
+from app.models import Expense
+from app.services import storage_service
+
+
+@pytest.fixture
+def receipt_key(client, tmp_path):
+    """Justificatif stocké dans le stockage temporaire du client."""
+    source = tmp_path / "receipt.png"
+    Image.new("RGB", (800, 400), "white").save(source)
+    return storage_service.store(source)
+
+
+def add_expense(database, file_path):
+    with database() as session:
+        expense = Expense(date=date(2024, 3, 5), amount_ttc=12.0, file_path=file_path)
+        session.add(expense)
+        session.commit()
+        return expense.id
+
+
+def test_get_file(client, database, receipt_key):
+    expense_id = add_expense(database, receipt_key)
+    content = storage_service.local_path(receipt_key).read_bytes()
+
+    response = client.get(f"/api/expenses/{expense_id}/file")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.content == content
+
+    response = client.get(f"/api/expenses/{expense_id}/file", headers={"Range": "bytes=0-7"})
+    assert response.status_code == 206
+    assert response.content == content[:8]
+
+    etag = response.headers["etag"]
+    response = client.get(f"/api/expenses/{expense_id}/file", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_thumbnail_generated_on_demand(client, database, receipt_key):
+    expense_id = add_expense(database, receipt_key)
+    response = client.get(f"/api/expenses/{expense_id}/thumbnail")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["cache-control"] == "private, max-age=86400"
+
+    # Deuxième appel: servi depuis le cache, même ETag
+    again = client.get(f"/api/expenses/{expense_id}/thumbnail")
+    assert again.headers["etag"] == response.headers["etag"]
+
+
+@pytest.mark.parametrize("file_path", [None, "ab/cd/missing.png"])
+def test_missing_receipt(client, database, file_path):
+    expense_id = add_expense(database, file_path)
+    assert client.get(f"/api/expenses/{expense_id}/file").status_code == 404
+    assert client.get(f"/api/expenses/{expense_id}/thumbnail").status_code == 404
+
+
+def test_unknown_expense(client):
+    assert client.get("/api/expenses/999/file").json() == {"detail": "Dépense non trouvée"}
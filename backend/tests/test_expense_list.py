@@ -0,0 +1,54 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Expense
+from app.schemas import ExpenseResponse
+
+
+@pytest.fixture
+def expenses(client, database):
+    with database() as session:
+        session.add_all([
+            Expense(date=date(2024, 3, 5), description="Déjeuner", amount_ht=10.0, tva=1.0,
+                    amount_ttc=11.0, tva_rate=10.0, category="repas", vendor="Café",
+                    file_path="ab/cd/a.jpg", ocr_raw="TOTAL 11,00"),
+            Expense(date=date(2024, 4, 1), amount_ttc=20.5, category="transport"),
+            # Colonnes facultatives vides
+            Expense(date=date(2024, 3, 28), amount_ttc=0.0),
+        ])
+        session.commit()
+
+
+def expected(database, *where):
+    """Ancien chemin: objets ORM validés par ExpenseResponse, sérialisés en JSON."""
+    with database() as session:
+        rows = session.scalars(select(Expense).where(*where).order_by(Expense.date.desc())).all()
+        return [ExpenseResponse.model_validate(row).model_dump(mode="json") for row in rows]
+
+
+def test_list_matches_expense_response(client, database, expenses):
+    response = client.get("/api/expenses/")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == expected(database)
+    assert [e["date"] for e in response.json()] == ["2024-04-01", "2024-03-28", "2024-03-05"]
+
+
+def test_list_filters(client, database, expenses):
+    response = client.get("/api/expenses/", params={"month": 3, "year": 2024, "category": "repas"})
+    assert response.json() == expected(database, Expense.category == "repas")
+
+
+def test_get_matches_expense_response(client, database, expenses):
+    for item in expected(database):
+        response = client.get(f"/api/expenses/{item['id']}")
+        assert response.status_code == 200
+        assert response.json() == item
+
+
+def test_get_unknown(client, expenses):
+    response = client.get("/api/expenses/999")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Dépense non trouvée"}
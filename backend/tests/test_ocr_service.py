@@ -0,0 +1,72 @@
+from unittest import mock
+
+import pytest
+
+from app.services.ocr_service import ExtractedData, OCRService
+
+VALID = "CARREFOUR\n05/03/2024\nTVA 20% 10,00 2,00\nTOTAL 12,00\n"
+INCONSISTENT = "CARREFOUR\n05/03/2024\nTVA 20% 10,00 2,00\nTOTAL 15,00\n"
+
+
+@pytest.fixture
+def service():
+    return OCRService(lang="fra+eng", tiered=True, min_confidence=70.0)
+
+
+@pytest.mark.parametrize("data, expected", [
+    (ExtractedData(amount_ttc=None), True),
+    (ExtractedData(amount_ttc=12.0, confidence=90.0), False),
+    # Passe complète: pas de confiance mesurée
+    (ExtractedData(amount_ttc=12.0), False),
+    (ExtractedData(amount_ttc=12.0, confidence=50.0), True),
+])
+def test_needs_escalation(service, data, expected):
+    assert service.needs_escalation(data) is expected
+
+
+def test_needs_escalation_on_inconsistent_vat(service):
+    assert service.needs_escalation(service.parse_text(INCONSISTENT)) is True
+    assert service.needs_escalation(service.parse_text(VALID)) is False
+
+
+def _run(service, texts, fast_confidence=95.0):
+    """extract_data() avec un texte OCR par niveau (fast, full, alternate)."""
+    fast, full, alternate = texts
+    with mock.patch.object(service, "load_images", return_value=[mock.sentinel.page]), \
+         mock.patch.object(service, "extract_text_fast", return_value=(fast, fast_confidence)), \
+         mock.patch.object(service, "extract_text_from_images", return_value=full), \
+         mock.patch("pytesseract.image_to_string", return_value=alternate):
+        return service.extract_data("ticket.jpg")
+
+
+def test_fast_pass_is_enough(service):
+    data = _run(service, (VALID, VALID, VALID))
+    assert data.ocr_tier == OCRService.TIER_FAST
+    assert service.stats()["tiers"]["full"]["runs"] == 0
+
+
+def test_escalates_until_valid(service):
+    data = _run(service, (INCONSISTENT, INCONSISTENT, VALID))
+    assert data.ocr_tier == OCRService.TIER_ALTERNATE
+    assert data.vat_validated
+
+
+def test_escalates_on_low_confidence(service):
+    data = _run(service, (VALID, VALID, VALID), fast_confidence=40.0)
+    assert data.ocr_tier == OCRService.TIER_FULL
+
+
+def test_hard_receipt_keeps_full_pass(service):
+    # Aucun niveau exploitable: résultat de la passe complète, pas de la passe rapide
+    data = _run(service, (INCONSISTENT, INCONSISTENT, INCONSISTENT))
+    assert data.ocr_tier == OCRService.TIER_FULL
+    stats = service.stats()
+    assert stats["documents"] == 1
+    assert stats["tiers"]["full"]["used"] == 1
+
+
+def test_untiered_runs_full_pass_only():
+    service = OCRService(tiered=False)
+    data = _run(service, (VALID, VALID, VALID))
+    assert data.ocr_tier == OCRService.TIER_FULL
+    assert service.stats()["tiers"]["fast"]["runs"] == 0
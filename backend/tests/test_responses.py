@@ -0,0 +1,103 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.responses import RangeFileResponse, parse_range
+
+CONTENT = bytes(range(256)) * 4  # 1024 octets
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=1000-", (1000, 1023)),
+    ("bytes=1000-5000", (1000, 1023)),
+    ("bytes=-24", (1000, 1023)),
+    ("bytes=-5000", (0, 1023)),
+    ("bytes=0-0", (0, 0)),
+    # Ignorés: la réponse complète est servie
+    ("items=0-99", None),
+    ("bytes=0-99,200-299", None),
+    ("bytes=abc-def", None),
+    ("bytes=-", None),
+    ("bytes=500-100", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(CONTENT)) == expected
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1024-", 1024),
+    ("bytes=2000-3000", 1024),
+    ("bytes=-0", 1024),
+    ("bytes=-10", 0),
+])
+def test_parse_range_unsatisfiable(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "receipt.bin"
+    path.write_bytes(CONTENT)
+
+    async def endpoint(request: Request):
+        return RangeFileResponse(path, request.headers, media_type="application/octet-stream",
+                                 filename="reçu.bin")
+
+    return TestClient(Starlette(routes=[Route("/file", endpoint)]))
+
+
+def test_full_response(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(CONTENT))
+    assert response.headers["content-disposition"] == "inline; filename*=utf-8''re%C3%A7u.bin"
+
+
+def test_partial_response(client):
+    response = client.get("/file", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[100:200]
+    assert response.headers["content-range"] == "bytes 100-199/1024"
+    assert response.headers["content-length"] == "100"
+
+
+def test_unsatisfiable_range(client):
+    response = client.get("/file", headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+    assert response.content == b""
+    assert response.headers["content-range"] == "bytes */1024"
+
+
+def test_not_modified(client):
+    etag = client.get("/file").headers["etag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/file", headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.content == b""
+    assert client.get("/file", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_range(client):
+    etag = client.get("/file").headers["etag"]
+    # ETag courant: la plage est servie
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    # ETag périmé: fichier complet
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+
+def test_head(client):
+    response = client.head("/file", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.headers["content-length"] == "10"
+    assert response.content == b""
@@ -0,0 +1,56 @@
+"""
+Test de fumée du driver S3 contre un stockage compatible local (MinIO).
+
+    docker compose --profile s3 up -d minio
+    S3_ENDPOINT_URL=http://localhost:9000 AWS_ACCESS_KEY_ID=minioadmin \\
+        AWS_SECRET_ACCESS_KEY=minioadmin pytest tests/test_storage_s3.py
+
+Ignoré si S3_ENDPOINT_URL n'est pas défini.
+"""
+import os
+import urllib.request
+import uuid
+
+import pytest
+
+from app.services.storage_service import S3StorageDriver, StorageService
+
+ENDPOINT = os.environ.get("S3_ENDPOINT_URL")
+pytestmark = pytest.mark.skipif(not ENDPOINT, reason="S3_ENDPOINT_URL non défini (MinIO requis)")
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    pytest.importorskip("boto3")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+    driver = S3StorageDriver(f"test-{uuid.uuid4().hex[:12]}", ENDPOINT)
+    driver.client.create_bucket(Bucket=driver.bucket)
+    yield StorageService(driver, staging_dir=tmp_path / "incoming")
+    for obj in driver.client.list_objects_v2(Bucket=driver.bucket).get("Contents", []):
+        driver.client.delete_object(Bucket=driver.bucket, Key=obj["Key"])
+    driver.client.delete_bucket(Bucket=driver.bucket)
+
+
+def test_s3_roundtrip(storage):
+    source = storage.staging_path("receipt.pdf")
+    source.write_bytes(b"%PDF-1.4 receipt")
+
+    key = storage.store(source)
+    assert storage.is_key(key)
+    assert not source.exists()
+    assert storage.local_path(key) is None
+
+    with storage.local_copy(key) as path:
+        assert path.read_bytes() == b"%PDF-1.4 receipt"
+
+    # URL présignée utilisable sans identifiants
+    with urllib.request.urlopen(storage.url(key, expires=60)) as response:
+        assert response.read() == b"%PDF-1.4 receipt"
+        # Ouvert dans le navigateur plutôt que téléchargé
+        assert response.headers["Content-Type"] == "application/pdf"
+        assert response.headers["Content-Disposition"] == "inline"
+
+    storage.delete(key)
+    with pytest.raises(FileNotFoundError):
+        with storage.local_copy(key):
+            pass
@@ -0,0 +1,103 @@
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from app.services.storage_service import LocalStorageDriver, S3StorageDriver, StorageService
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return StorageService(LocalStorageDriver(tmp_path / "store"), staging_dir=tmp_path / "incoming")
+
+
+def test_make_key_is_stable_and_sharded():
+    key = StorageService.make_key("0b5f1c3e-receipt.jpg")
+    assert key == StorageService.make_key("0b5f1c3e-receipt.jpg")
+    shard_a, shard_b, name = key.split("/")
+    assert len(shard_a) == len(shard_b) == 2
+    assert name == "0b5f1c3e-receipt.jpg"
+    # Même nom de base, extension différente (recompression): même répertoire
+    assert StorageService.make_key("0b5f1c3e-receipt.webp").rsplit("/", 1)[0] == key.rsplit("/", 1)[0]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("3f/a2/abc.jpg", True),
+    ("uploads/abc.jpg", False),
+    ("abc.jpg", False),
+    ("3F/A2/abc.jpg", False),
+    ("3f/a2/sub/abc.jpg", False),
+])
+def test_is_key(storage, value, expected):
+    assert storage.is_key(value) is expected
+
+
+def test_store_local_copy_and_delete(storage):
+    source = storage.staging_path("receipt.pdf")
+    source.write_bytes(b"%PDF-1.4")
+
+    key = storage.store(source)
+    assert storage.is_key(key)
+    assert not source.exists()
+    with storage.local_copy(key) as path:
+        assert path.read_bytes() == b"%PDF-1.4"
+
+    storage.delete(key)
+    with pytest.raises(FileNotFoundError):
+        with storage.local_copy(key):
+            pass
+    # Suppression idempotente
+    storage.delete(key)
+
+
+def test_store_keep_source(storage):
+    source = storage.staging_path("receipt.pdf")
+    source.write_bytes(b"data")
+    key = storage.store(source, keep_source=True)
+    assert source.exists()
+    assert storage.local_path(key).read_bytes() == b"data"
+
+
+def test_legacy_paths(storage, tmp_path):
+    legacy = tmp_path / "uploads" / "old.jpg"
+    legacy.parent.mkdir()
+    legacy.write_bytes(b"old")
+    assert storage.local_path(str(legacy)) == legacy
+    storage.delete(str(legacy))
+    assert not legacy.exists()
+
+
+def test_unknown_recompress_mode(tmp_path):
+    with pytest.raises(ValueError):
+        StorageService(LocalStorageDriver(tmp_path), tmp_path, recompress="lossy")
+
+
+@pytest.mark.parametrize("name, content_type", [
+    ("receipt.pdf", "application/pdf"),
+    ("receipt.webp", "image/webp"),
+    ("receipt.jpg", "image/jpeg"),
+    ("receipt.unknown", "application/octet-stream"),
+])
+def test_s3_put_file_sets_content_type(tmp_path, name, content_type):
+    driver = S3StorageDriver("receipts")
+    driver._client = mock.Mock()
+    source = tmp_path / name
+    source.write_bytes(b"data")
+
+    key = StorageService.make_key(name)
+    driver.put_file(source, key)
+    driver.client.upload_file.assert_called_once_with(
+        str(source), "receipts", key, ExtraArgs={"ContentType": content_type}
+    )
+    assert not source.exists()
+
+
+def test_s3_url_is_inline():
+    driver = S3StorageDriver("receipts")
+    driver._client = mock.Mock()
+    driver.url("ab/cd/receipt.pdf", expires=60)
+    driver.client.generate_presigned_url.assert_called_once_with(
+        "get_object",
+        Params={"Bucket": "receipts", "Key": "ab/cd/receipt.pdf", "ResponseContentDisposition": "inline"},
+        ExpiresIn=60,
+    )
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models import Expense, TenantRouter
+from app.models.database import make_tenant_token, read_tenant_token
+
+
+def test_tenant_token_roundtrip():
+    assert read_tenant_token(make_tenant_token(42)) == 42
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "42",
+    "42.9999999999.deadbeef",
+    "1.9999999999.é",
+    make_tenant_token(42).replace("42.", "43.", 1),
+    make_tenant_token(42, ttl=-1),
+])
+def test_tenant_token_rejected(token):
+    assert read_tenant_token(token) is None
+
+
+@pytest.mark.anyio
+async def test_fan_out_leaves_engine_cache_untouched(tmp_path: Path):
+    base = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/main.db")
+    router = TenantRouter(base, tmp_path / "tenants", max_engines=2)
+    for tenant_id in (1, 2, 3, 4):
+        factory = await router.session_factory(tenant_id)
+        async with factory() as session:
+            session.add_all(Expense(amount_ttc=1.0) for _ in range(tenant_id))
+            await session.commit()
+    hot = list(router._sessions)
+
+    async def count(session):
+        return (await session.execute(select(func.count(Expense.id)))).scalar()
+
+    assert await router.fan_out(count, concurrency=2) == {1: 1, 2: 2, 3: 3, 4: 4}
+    assert list(router._sessions) == hot
+    for tenant_engine, _ in router._sessions.values():
+        await tenant_engine.dispose()
+    await base.dispose()
+
+
+@pytest.mark.anyio
+async def test_malformed_token_is_rejected_with_403(monkeypatch, tmp_path):
+    from fastapi import HTTPException
+    from app.models import database
+
+    monkeypatch.setattr(database, "tenant_router", TenantRouter(database.engine, tmp_path / "tenants"))
+    with pytest.raises(HTTPException) as error:
+        await database.get_tenant_id(x_tenant_id=None, tenant_token="1.9999999999.é")
+    assert error.value.status_code == 403
+    with pytest.raises(HTTPException) as error:
+        await database.get_tenant_id(x_tenant_id=None, tenant_token=None)
+    assert error.value.status_code == 400
+    assert await database.get_tenant_id(x_tenant_id=None, tenant_token=make_tenant_token(7)) == 7
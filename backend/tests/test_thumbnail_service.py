@@ -0,0 +1,65 @@
+from unittest import mock
+
+import pytest
+from PIL import Image
+
+from app.services.thumbnail_service import ThumbnailService
+
+
+@pytest.fixture
+def service(tmp_path):
+    return ThumbnailService(cache_dir=tmp_path / "thumbnails", size=64, quality=75)
+
+
+@pytest.fixture
+def receipt(tmp_path):
+    path = tmp_path / "receipt.png"
+    Image.new("RGBA", (400, 200), "white").save(path)
+    return path
+
+
+def test_generate_from_file(service, receipt):
+    target = service.generate(receipt)
+    assert target == service.thumbnail_path(receipt)
+    with Image.open(target) as thumb:
+        assert thumb.format == "WEBP"
+        assert thumb.size == (64, 32)
+    assert [p.name for p in service.cache_dir.iterdir()] == ["receipt.webp"]
+
+
+def test_generate_reuses_decoded_image(service, receipt):
+    image = Image.new("RGB", (300, 300), "red")
+    with mock.patch.object(service, "_load_first_page") as load:
+        target = service.generate(receipt, image=image)
+    load.assert_not_called()
+    # L'image partagée avec l'OCR n'est pas modifiée
+    assert image.size == (300, 300)
+    with Image.open(target) as thumb:
+        assert thumb.size == (64, 64)
+
+
+def test_cache_hit(service, receipt):
+    target = service.generate(receipt)
+    mtime = target.stat().st_mtime_ns
+    with mock.patch.object(service, "_load_first_page") as load:
+        assert service.generate(receipt) == target
+    load.assert_not_called()
+    assert target.stat().st_mtime_ns == mtime
+
+
+def test_pdf_renders_first_page_only(service, tmp_path):
+    pdf = tmp_path / "invoice.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    page = Image.new("RGB", (595, 842), "white")
+    with mock.patch("pdf2image.convert_from_path", return_value=[page]) as convert:
+        target = service.generate(pdf)
+    convert.assert_called_once_with(pdf, dpi=72, first_page=1, last_page=1)
+    with Image.open(target) as thumb:
+        assert max(thumb.size) == 64
+
+
+def test_delete(service, receipt):
+    target = service.generate(receipt)
+    service.delete(receipt)
+    assert not target.exists()
+    service.delete(receipt)
@@ -4,6 +4,23 @@ const api = axios.create({
   baseURL: '/api',
 });
 
+// Jeton signé du tenant pour les URL chargées sans en-têtes (<img src>, window.open)
+let tenantToken = null;
+
+// Active le tenant (TENANT_SHARDING): en-tête X-Tenant-ID + jeton pour les URL
+export const setTenant = async (tenantId) => {
+  api.defaults.headers.common['X-Tenant-ID'] = tenantId;
+  const response = await api.get('/expenses/tenant-token');
+  tenantToken = response.data.token;
+  return response.data;
+};
+
+const withTenant = (url) => {
+  if (!tenantToken) return url;
+  const separator = url.includes('?') ? '&' : '?';
+  return `${url}${separator}tenant_token=${encodeURIComponent(tenantToken)}`;
+};
+
 export const expenseApi = {
   // Upload un fichier et créer une dépense
   upload: async (file) => {
@@ -39,14 +56,49 @@ export const expenseApi = {
     return response.data;
   },
 
+  // Mettre à jour un lot ({ ids } ou { filter }, + changes)
+  batchUpdate: async (selection, changes) => {
+    const response = await api.patch('/expenses/batch', { ...selection, changes });
+    return response.data;
+  },
+
+  // Supprimer un lot ({ ids } ou { filter })
+  batchDelete: async (selection) => {
+    const response = await api.delete('/expenses/batch', { data: selection });
+    return response.data;
+  },
+
+  // Tendances mensuelles par catégorie
+  analytics: async (params = {}) => {
+    const response = await api.get('/expenses/analytics', { params });
+    return response.data;
+  },
+
+  // Importer un relevé bancaire (CSV/OFX) et le rapprocher des dépenses
+  importBankStatement: async (file, params = {}) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    const response = await api.post('/bank/import', formData, {
+      params,
+      headers: { 'Content-Type': 'multipart/form-data' }
+    });
+    return response.data;
+  },
+
+  // URL du justificatif original
+  fileUrl: (id) => withTenant(`/api/expenses/${id}/file`),
+
+  // URL de la miniature du justificatif
+  thumbnailUrl: (id) => withTenant(`/api/expenses/${id}/thumbnail`),
+
   // Exporter en Excel
   exportExcel: (month, year) => {
-    window.open(`/api/expenses/export/excel?month=${month}&year=${year}`, '_blank');
+    window.open(withTenant(`/api/expenses/export/excel?month=${month}&year=${year}`), '_blank');
   },
 
   // Exporter en PDF
   exportPdf: (month, year) => {
-    window.open(`/api/expenses/export/pdf?month=${month}&year=${year}`, '_blank');
+    window.open(withTenant(`/api/expenses/export/pdf?month=${month}&year=${year}`), '_blank');
   },
 };
 